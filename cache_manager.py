@@ -4,19 +4,39 @@
 """
 
 import pickle
+import sqlite3
 import numpy as np
 import os
+import sys
 import time
+import atexit
+import queue
+import threading
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Callable
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import hashlib
 
-from config import CACHE_FILE, METADATA_CACHE_FILE
+from config import (CACHE_FILE, EMBEDDINGS_MATRIX_FILE, EMBEDDINGS_SIGNATURES_FILE,
+                   EMBEDDINGS_COMPRESSED_FILE, COMPRESS_EMBEDDINGS_CACHE, METADATA_CACHE_FILE,
+                   PROGRESS_DB_FILE, CLIP_EMBEDDING_DIM, ensure_cache_dir)
+
+# Опциональная зависимость для сжатия матрицы эмбеддингов на диске
+try:
+    import blosc2
+except ImportError:
+    blosc2 = None
 
 logger = logging.getLogger(__name__)
 
+# Размер буфера файлового ввода-вывода для кэша (1 МБ)
+IO_BUFFER_SIZE = 1 << 20
+
+# Количество потоков для пакетного получения os.stat
+STAT_WORKERS = 16
+
 class CacheManager:
     """
     Класс для управления кэшем эмбеддингов изображений и метаданных.
@@ -25,89 +45,410 @@ class CacheManager:
     
     def __init__(self):
         """Инициализация менеджера кэша."""
-        self.embeddings_cache: Dict[str, np.ndarray] = {}
-        self.metadata_cache: Dict[str, dict] = {}
+        ensure_cache_dir()
+        
+        # Эмбеддинги хранятся одной непрерывной матрицей (N, D) и индексом путь -> строка
+        self._matrix: Optional[np.ndarray] = None
+        # Сигнатуры файлов (размер, mtime_ns), выровненные по строкам матрицы
+        self._sig: Optional[np.ndarray] = None
+        # Время кэширования (Unix-время в нс, int64), также выровненное по строкам матрицы
+        self._cached_at: Optional[np.ndarray] = None
+        self._row: Dict[str, int] = {}
+        self._rows_used = 0
+        # Количество путей, уже дописанных в журнал прогресса каждой директории
+        self._progress_written: Dict[str, int] = {}
+        self._progress_lock = threading.Lock()
+        self._progress_db = self._open_progress_db()
         self._load_cache()
+        
+        # Фоновая запись кэша: в очереди хранится только последний снимок
+        self._save_queue: queue.Queue = queue.Queue(maxsize=1)
+        self._save_lock = threading.Lock()
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.flush)
     
-    def _get_file_hash(self, file_path: str) -> str:
+    def _get_file_signature(self, file_path: str) -> Optional[Tuple[int, int]]:
         """
-        Создание хэша файла для отслеживания изменений.
+        Получение сигнатуры файла для отслеживания изменений.
         
         Args:
             file_path: Путь к файлу
             
         Returns:
-            str: MD5 хэш файла
+            Optional[Tuple[int, int]]: (размер, время модификации в нс) или None
         """
         try:
             stat = os.stat(file_path)
-            # Используем размер и время модификации для создания хэша
-            hash_string = f"{file_path}_{stat.st_size}_{stat.st_mtime}"
-            return hashlib.md5(hash_string.encode()).hexdigest()
+            return (stat.st_size, stat.st_mtime_ns)
         except OSError:
-            return ""
+            return None
     
-    def _load_cache(self) -> None:
-        """Загрузка кэша из файлов."""
-        try:
-            # Загрузка эмбеддингов
-            if CACHE_FILE.exists():
-                with open(CACHE_FILE, 'rb') as f:
-                    self.embeddings_cache = pickle.load(f)
-                logger.info(f"Загружено {len(self.embeddings_cache)} эмбеддингов из кэша")
+    def _stat_many(self, file_paths: List[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        Пакетное получение сигнатур для списка файлов.
+        Файлы одной папки читаются одним os.scandir, иначе stat выполняется в пуле потоков.
+        
+        Args:
+            file_paths: Список путей к файлам
             
-            # Загрузка метаданных
-            if METADATA_CACHE_FILE.exists():
-                with open(METADATA_CACHE_FILE, 'rb') as f:
-                    self.metadata_cache = pickle.load(f)
-                logger.info(f"Загружено {len(self.metadata_cache)} записей метаданных")
-                
-        except Exception as e:
-            logger.warning(f"Ошибка при загрузке кэша: {e}")
-            self.embeddings_cache = {}
-            self.metadata_cache = {}
+        Returns:
+            Dict[str, Tuple[int, int]]: Сигнатуры доступных файлов {путь: (размер, mtime_ns)}
+        """
+        signatures = {}
+        if not file_paths:
+            return signatures
+        
+        parents = {os.path.dirname(path) for path in file_paths}
+        if len(parents) == 1:
+            wanted = {os.path.basename(path): path for path in file_paths}
+            try:
+                with os.scandir(parents.pop() or '.') as entries:
+                    for entry in entries:
+                        path = wanted.get(entry.name)
+                        if path is None:
+                            continue
+                        try:
+                            stat = entry.stat()
+                            signatures[path] = (stat.st_size, stat.st_mtime_ns)
+                        except OSError:
+                            pass
+            except OSError as e:
+                logger.warning(f"Не удалось прочитать директорию: {e}")
+            return signatures
+        
+        with ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+            for path, signature in zip(file_paths, executor.map(self._get_file_signature, file_paths)):
+                if signature is not None:
+                    signatures[path] = signature
+        return signatures
     
-    def save_cache(self) -> None:
-        """Сохранение кэша в файлы."""
+    def _open_progress_db(self) -> sqlite3.Connection:
+        """
+        Открытие базы прогресса обработки чанков.
+        
+        Returns:
+            sqlite3.Connection: Соединение с базой (используется из разных потоков под блокировкой)
+        """
+        PROGRESS_DB_FILE.parent.mkdir(exist_ok=True)
+        connection = sqlite3.connect(str(PROGRESS_DB_FILE), check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS progress ("
+                "dir_path TEXT PRIMARY KEY, processed_chunks INTEGER, total_chunks INTEGER, ts REAL)"
+            )
+            # Обработанные файлы хранятся построчно, чтобы дописывать только новые пути
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS progress_files (dir_path TEXT NOT NULL, file_path TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS progress_files_dir ON progress_files (dir_path)"
+            )
+        return connection
+    
+    def _ensure_capacity(self, rows_needed: int, dim: int) -> None:
+        """
+        Расширение матрицы эмбеддингов и выровненных массивов с удвоением емкости.
+        Отображенная в память (только для чтения) матрица копируется в RAM.
+        
+        Args:
+            rows_needed: Требуемое количество строк
+            dim: Размерность эмбеддинга
+        """
+        if (self._matrix is not None and self._matrix.shape[0] >= rows_needed
+                and self._matrix.flags.writeable):
+            return
+        
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        self._resize(max(rows_needed, capacity * 2, 1), dim)
+    
+    def _resize(self, new_capacity: int, dim: int) -> None:
+        """
+        Перевыделение матрицы эмбеддингов и выровненных массивов с копированием занятых строк.
+        
+        Args:
+            new_capacity: Новая емкость в строках
+            dim: Размерность эмбеддинга
+        """
+        new_matrix = np.empty((new_capacity, dim), dtype=np.float32)
+        new_sig = np.full((new_capacity, 2), -1, dtype=np.int64)
+        new_cached_at = np.zeros(new_capacity, dtype=np.int64)
+        if self._rows_used:
+            new_matrix[:self._rows_used] = self._matrix[:self._rows_used]
+            new_sig[:self._rows_used] = self._sig[:self._rows_used]
+            new_cached_at[:self._rows_used] = self._cached_at[:self._rows_used]
+        self._matrix = new_matrix
+        self._sig = new_sig
+        self._cached_at = new_cached_at
+    
+    def reserve(self, count: int, dim: int = CLIP_EMBEDDING_DIM) -> None:
+        """
+        Предварительное выделение места под новые эмбеддинги одним перевыделением.
+        
+        Args:
+            count: Ожидаемое количество новых эмбеддингов
+            dim: Размерность эмбеддинга (если матрица еще не создана)
+        """
+        rows_needed = self._rows_used + count
+        if self._matrix is not None:
+            if self._matrix.shape[0] >= rows_needed and self._matrix.flags.writeable:
+                return
+            dim = self._matrix.shape[1]
+        self._resize(rows_needed, dim)
+    
+    def _compact(self) -> None:
+        """Удаление из матрицы строк, на которые больше не ссылается индекс."""
+        if self._matrix is None or len(self._row) == self._rows_used:
+            return
+        
+        paths = list(self._row.keys())
+        rows = np.fromiter(self._row.values(), dtype=np.intp, count=len(paths))
+        self._matrix = self._matrix[rows]
+        self._sig = self._sig[rows]
+        self._cached_at = self._cached_at[rows]
+        self._row = {path: i for i, path in enumerate(paths)}
+        self._rows_used = len(paths)
+    
+    def _load_matrix(self) -> Optional[np.ndarray]:
+        """
+        Загрузка матрицы эмбеддингов с диска.
+        
+        Returns:
+            Optional[np.ndarray]: Матрица эмбеддингов или None если файла нет
+        """
+        if EMBEDDINGS_COMPRESSED_FILE.exists():
+            if blosc2 is not None:
+                with open(EMBEDDINGS_COMPRESSED_FILE, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                    return blosc2.unpack_array2(f.read())
+            logger.warning("Кэш эмбеддингов сжат blosc2, но пакет blosc2 не установлен")
+        
+        if EMBEDDINGS_MATRIX_FILE.exists():
+            # Матрица отображается в память: строки подгружаются ОС по требованию
+            return np.load(EMBEDDINGS_MATRIX_FILE, mmap_mode='r')
+        
+        return None
+    
+    def _load_row_array(self, file_path: Path, shape: tuple, dtype, fill_value) -> np.ndarray:
+        """
+        Загрузка массива, выровненного по строкам матрицы эмбеддингов.
+        
+        Args:
+            file_path: Путь к файлу .npy
+            shape: Ожидаемая форма массива
+            dtype: Тип элементов
+            fill_value: Значение по умолчанию при отсутствии или несовпадении данных
+            
+        Returns:
+            np.ndarray: Загруженный массив или массив, заполненный fill_value
+        """
+        if file_path.exists():
+            array = np.load(file_path)
+            if array.shape == shape and array.dtype == dtype:
+                return array
+            logger.warning(f"Файл {file_path.name} не совпадает с матрицей эмбеддингов")
+        return np.full(shape, fill_value, dtype=dtype)
+    
+    def _write_atomically(self, target: Path, write: Callable) -> None:
+        """
+        Запись файла через временный файл и os.replace.
+        Прерванная запись не повреждает существующий файл, а его отображение в память остается валидным.
+        
+        Args:
+            target: Итоговый путь к файлу
+            write: Функция, записывающая данные в открытый файловый объект
+        """
+        tmp_file = target.with_name(target.name + '.tmp')
+        with open(tmp_file, 'wb', buffering=IO_BUFFER_SIZE) as f:
+            write(f)
+        os.replace(tmp_file, target)
+    
+    def _write_matrix(self, snapshot: dict) -> None:
+        """
+        Запись матрицы эмбеддингов, сигнатур и времени кэширования из снимка кэша.
+        
+        Args:
+            snapshot: Снимок состояния кэша
+        """
+        matrix = snapshot['matrix']
+        signatures = snapshot['signatures']
+        cached_at = snapshot['cached_at']
+        
+        if snapshot['matrix_unchanged']:
+            # Отображенная из файла матрица (и ее сигнатуры) не изменялась и не требует записи
+            return
+        elif matrix is None:
+            stale_files = [EMBEDDINGS_MATRIX_FILE, EMBEDDINGS_SIGNATURES_FILE, METADATA_CACHE_FILE,
+                           EMBEDDINGS_COMPRESSED_FILE]
+        elif COMPRESS_EMBEDDINGS_CACHE and blosc2 is not None:
+            data = blosc2.pack_array2(
+                np.ascontiguousarray(matrix),
+                cparams={'codec': blosc2.Codec.LZ4, 'clevel': 1}
+            )
+            self._write_atomically(EMBEDDINGS_COMPRESSED_FILE, lambda f: f.write(data))
+            stale_files = [EMBEDDINGS_MATRIX_FILE]
+        else:
+            self._write_atomically(EMBEDDINGS_MATRIX_FILE, lambda f: np.save(f, matrix))
+            stale_files = [EMBEDDINGS_COMPRESSED_FILE]
+        
+        if matrix is not None:
+            self._write_atomically(EMBEDDINGS_SIGNATURES_FILE, lambda f: np.save(f, signatures))
+            self._write_atomically(METADATA_CACHE_FILE, lambda f: np.save(f, cached_at))
+        
+        for stale_file in stale_files:
+            if stale_file.exists():
+                try:
+                    stale_file.unlink()
+                except OSError as e:
+                    logger.warning(f"Не удалось удалить устаревший файл кэша {stale_file}: {e}")
+    
+    def _take_snapshot(self) -> dict:
+        """
+        Создание снимка состояния кэша для фоновой записи.
+        
+        Returns:
+            dict: Снимок с матрицей, выровненными массивами и индексом путей
+        """
+        self._compact()
+        
+        matrix_unchanged = isinstance(self._matrix, np.memmap)
+        has_matrix = self._matrix is not None and not matrix_unchanged
+        
+        # Сигнатуры копируются сразу: записанная позже матрица может оказаться
+        # только новее их, что приводит лишь к повторному вычислению эмбеддинга
+        return {
+            'matrix': self._matrix[:self._rows_used] if has_matrix else None,
+            'signatures': self._sig[:self._rows_used].copy() if has_matrix else None,
+            'cached_at': self._cached_at[:self._rows_used].copy() if has_matrix else None,
+            'matrix_unchanged': matrix_unchanged,
+            'row_index': dict(self._row)
+        }
+    
+    def _write_snapshot(self, snapshot: dict) -> None:
+        """
+        Запись снимка кэша в файлы.
+        
+        Args:
+            snapshot: Снимок состояния кэша
+        """
         try:
             # Создание директории если не существует
             CACHE_FILE.parent.mkdir(exist_ok=True)
             
-            # Сохранение эмбеддингов
-            with open(CACHE_FILE, 'wb') as f:
-                pickle.dump(self.embeddings_cache, f)
+            # Сохранение матрицы эмбеддингов
+            self._write_matrix(snapshot)
             
-            # Сохранение метаданных
-            with open(METADATA_CACHE_FILE, 'wb') as f:
-                pickle.dump(self.metadata_cache, f)
+            # Сохранение индекса путей
+            row_index = snapshot['row_index']
+            self._write_atomically(
+                CACHE_FILE,
+                lambda f: pickle.dump(row_index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            )
             
             logger.info("Кэш успешно сохранен")
             
         except Exception as e:
             logger.error(f"Ошибка при сохранении кэша: {e}")
     
-    def get_cached_embedding(self, file_path: str) -> Optional[np.ndarray]:
+    def _writer_loop(self) -> None:
+        """Цикл фонового потока записи кэша."""
+        while True:
+            snapshot = self._save_queue.get()
+            try:
+                self._write_snapshot(snapshot)
+            finally:
+                self._save_queue.task_done()
+    
+    def _load_cache(self) -> None:
+        """Загрузка кэша из файлов."""
+        try:
+            # Загрузка индекса путей и матрицы эмбеддингов
+            if CACHE_FILE.exists():
+                with open(CACHE_FILE, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                    row_index = pickle.load(f)
+                
+                matrix = self._load_matrix()
+                if matrix is not None:
+                    self._matrix = matrix
+                    rows = matrix.shape[0]
+                    self._sig = self._load_row_array(EMBEDDINGS_SIGNATURES_FILE, (rows, 2), np.int64, -1)
+                    self._cached_at = self._load_row_array(METADATA_CACHE_FILE, (rows,), np.int64, 0)
+                    # Интернирование путей: индекс и журнал прогресса разделяют один объект строки
+                    self._row = {sys.intern(path): row for path, row in row_index.items()}
+                    self._rows_used = self._matrix.shape[0]
+                elif row_index and isinstance(next(iter(row_index.values())), np.ndarray):
+                    # Кэш старого формата: словарь {путь: эмбеддинг}
+                    self._row = {sys.intern(path): i for i, path in enumerate(row_index)}
+                    self._matrix = np.vstack(list(row_index.values())).astype(np.float32, copy=False)
+                    self._sig = np.full((self._matrix.shape[0], 2), -1, dtype=np.int64)
+                    self._cached_at = np.zeros(self._matrix.shape[0], dtype=np.int64)
+                    self._rows_used = self._matrix.shape[0]
+                logger.info(f"Загружено {len(self._row)} эмбеддингов из кэша")
+                
+        except Exception as e:
+            logger.warning(f"Ошибка при загрузке кэша: {e}")
+            self._matrix = None
+            self._sig = None
+            self._cached_at = None
+            self._row = {}
+            self._rows_used = 0
+    
+    def save_cache(self) -> None:
         """
-        Получение эмбеддинга из кэша.
+        Сохранение кэша в файлы.
+        Запись выполняется в фоновом потоке; еще не записанный снимок заменяется новым.
+        """
+        snapshot = self._take_snapshot()
+        
+        with self._save_lock:
+            try:
+                self._save_queue.get_nowait()
+                self._save_queue.task_done()
+            except queue.Empty:
+                pass
+            self._save_queue.put_nowait(snapshot)
+    
+    def flush(self) -> None:
+        """Ожидание завершения фоновой записи кэша."""
+        self._save_queue.join()
+    
+    def _get_valid_row(self, file_path: str) -> Optional[int]:
+        """
+        Получение строки матрицы для актуальной записи кэша.
         
         Args:
             file_path: Путь к файлу изображения
             
         Returns:
-            Optional[np.ndarray]: Эмбеддинг если найден в кэше, None иначе
+            Optional[int]: Номер строки если запись актуальна, None иначе
         """
-        file_hash = self._get_file_hash(file_path)
-        if not file_hash:
+        signature = self._get_file_signature(file_path)
+        if signature is None:
             return None
         
         # Проверяем актуальность кэша
-        if file_path in self.metadata_cache:
-            cached_hash = self.metadata_cache[file_path].get('file_hash', '')
-            if cached_hash == file_hash and file_path in self.embeddings_cache:
-                return self.embeddings_cache[file_path]
+        row = self._row.get(file_path)
+        if row is not None and tuple(self._sig[row]) == signature:
+            return row
         
         return None
     
+    def get_cached_embedding(self, file_path: str) -> Optional[np.ndarray]:
+        """
+        Получение эмбеддинга из кэша.
+        
+        Args:
+            file_path: Путь к файлу изображения
+            
+        Returns:
+            Optional[np.ndarray]: Эмбеддинг если найден в кэше, None иначе
+        """
+        row = self._get_valid_row(file_path)
+        if row is None:
+            return None
+        return self._matrix[row]
+    
     def cache_embedding(self, file_path: str, embedding: np.ndarray) -> None:
         """
         Сохранение эмбеддинга в кэш.
@@ -116,16 +457,20 @@ class CacheManager:
             file_path: Путь к файлу изображения
             embedding: Эмбеддинг изображения
         """
-        file_hash = self._get_file_hash(file_path)
-        if not file_hash:
+        signature = self._get_file_signature(file_path)
+        if signature is None:
             return
         
-        self.embeddings_cache[file_path] = embedding
-        self.metadata_cache[file_path] = {
-            'file_hash': file_hash,
-            'cached_at': datetime.now().isoformat(),
-            'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0
-        }
+        file_path = sys.intern(file_path)
+        self._ensure_capacity(self._rows_used + 1, embedding.shape[-1])
+        row = self._row.get(file_path)
+        if row is None:
+            row = self._rows_used
+            self._row[file_path] = row
+            self._rows_used += 1
+        self._matrix[row] = embedding
+        self._sig[row] = signature
+        self._cached_at[row] = time.time_ns()
     
     def get_cached_embeddings_for_paths(self, file_paths: List[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
         """
@@ -138,19 +483,65 @@ class CacheManager:
             Tuple[Dict[str, np.ndarray], List[str]]: 
                 Словарь с кэшированными эмбеддингами и список некэшированных путей
         """
+        # Пустой кэш (первое сканирование): проверять нечего
+        if not self._row:
+            logger.info(f"Кэш пуст, требует обработки: {len(file_paths)}")
+            return {}, list(file_paths)
+        
+        requested = set(file_paths)
+        all_indexed = requested <= self._row.keys()
+        
+        # Проверяем сигнатуры только у путей, которые вообще есть в кэше
+        candidates = requested if all_indexed else self._row.keys() & requested
+        signatures = self._stat_many(list(candidates))
+        
+        valid_paths = set()
+        if signatures:
+            # Сравнение сигнатур одной векторной операцией
+            paths = list(signatures.keys())
+            rows = np.fromiter((self._row[path] for path in paths), dtype=np.intp, count=len(paths))
+            observed = np.array(list(signatures.values()), dtype=np.int64)
+            matches = (self._sig[rows] == observed).all(axis=1)
+            valid_paths = {path for path, match in zip(paths, matches) if match}
+        
+        if len(valid_paths) == len(requested):
+            # Все пути актуальны (повторный запуск): разбиение не требуется
+            cached_paths = list(file_paths)
+            uncached_paths = []
+        else:
+            cached_paths = [path for path in file_paths if path in valid_paths]
+            uncached_paths = [path for path in file_paths if path not in valid_paths]
+        cached_rows = [self._row[path] for path in cached_paths]
+        
+        # Одна выборка строк из матрицы вместо копирования по одному эмбеддингу
         cached_embeddings = {}
-        uncached_paths = []
-        
-        for path in file_paths:
-            embedding = self.get_cached_embedding(path)
-            if embedding is not None:
-                cached_embeddings[path] = embedding
-            else:
-                uncached_paths.append(path)
+        if cached_rows:
+            stacked = self._matrix[np.asarray(cached_rows, dtype=np.intp)]
+            cached_embeddings = dict(zip(cached_paths, stacked))
         
         logger.info(f"Найдено в кэше: {len(cached_embeddings)}, требует обработки: {len(uncached_paths)}")
         return cached_embeddings, uncached_paths
     
+    def get_cached_matrix(self, file_paths: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Получение эмбеддингов для списка путей одной матрицей без проверки сигнатур.
+        
+        Args:
+            file_paths: Список путей к файлам
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Матрица (M, D) float32 эмбеддингов найденных путей
+                в порядке file_paths и булева маска длины len(file_paths) с признаком наличия в кэше
+        """
+        rows = np.fromiter((self._row.get(path, -1) for path in file_paths),
+                           dtype=np.intp, count=len(file_paths))
+        mask = rows >= 0
+        
+        if self._matrix is None:
+            return np.empty((0, CLIP_EMBEDDING_DIM), dtype=np.float32), mask
+        
+        return self._matrix[rows[mask]], mask
+    
     def cache_batch_embeddings(self, embeddings_dict: Dict[str, np.ndarray]) -> None:
         """
         Сохранение множественных эмбеддингов в кэш.
@@ -158,8 +549,28 @@ class CacheManager:
         Args:
             embeddings_dict: Словарь с эмбеддингами {путь_к_файлу: эмбеддинг}
         """
-        for file_path, embedding in embeddings_dict.items():
-            self.cache_embedding(file_path, embedding)
+        signatures = self._stat_many(list(embeddings_dict.keys()))
+        if not signatures:
+            return
+        
+        paths = list(signatures.keys())
+        first_embedding = embeddings_dict[paths[0]]
+        self._ensure_capacity(self._rows_used + len(paths), first_embedding.shape[-1])
+        
+        rows = np.empty(len(paths), dtype=np.intp)
+        for i, file_path in enumerate(paths):
+            file_path = sys.intern(file_path)
+            row = self._row.get(file_path)
+            if row is None:
+                row = self._rows_used
+                self._row[file_path] = row
+                self._rows_used += 1
+            rows[i] = row
+        
+        # Одна запись всех строк вместо построчного копирования
+        self._matrix[rows] = np.stack([embeddings_dict[path] for path in paths])
+        self._sig[rows] = np.array(list(signatures.values()), dtype=np.int64)
+        self._cached_at[rows] = time.time_ns()
     
     def remove_invalid_cache_entries(self, valid_paths: List[str]) -> None:
         """
@@ -170,15 +581,13 @@ class CacheManager:
         """
         valid_paths_set = set(valid_paths)
         
-        # Удаление недействительных эмбеддингов
-        invalid_embeddings = [path for path in self.embeddings_cache.keys() 
-                            if path not in valid_paths_set or not os.path.exists(path)]
-        
-        for path in invalid_embeddings:
-            self.embeddings_cache.pop(path, None)
-            self.metadata_cache.pop(path, None)
+        # Пути из valid_paths только что получены сканированием, поэтому
+        # недействительные записи определяются разностью множеств без os.stat
+        invalid_embeddings = self._row.keys() - valid_paths_set
         
         if invalid_embeddings:
+            self._row = {path: row for path, row in self._row.items() if path in valid_paths_set}
+            self._compact()
             logger.info(f"Удалено {len(invalid_embeddings)} недействительных записей из кэша")
     
     def get_cache_stats(self) -> Dict[str, any]:
@@ -192,19 +601,21 @@ class CacheManager:
         oldest_entry = None
         newest_entry = None
         
-        for metadata in self.metadata_cache.values():
-            if 'file_size' in metadata:
-                total_size += metadata['file_size']
+        if self._row:
+            # Агрегация по выровненным массивам вместо цикла по записям
+            rows = np.fromiter(self._row.values(), dtype=np.intp, count=len(self._row))
+            sizes = self._sig[rows, 0]
+            total_size = int(sizes[sizes > 0].sum())
             
-            if 'cached_at' in metadata:
-                cached_at = metadata['cached_at']
-                if oldest_entry is None or cached_at < oldest_entry:
-                    oldest_entry = cached_at
-                if newest_entry is None or cached_at > newest_entry:
-                    newest_entry = cached_at
+            cached_at = self._cached_at[rows]
+            cached_at = cached_at[cached_at > 0]
+            if cached_at.size:
+                # В ISO переводятся только два итоговых значения
+                oldest_entry = datetime.fromtimestamp(cached_at.min() / 1e9).isoformat()
+                newest_entry = datetime.fromtimestamp(cached_at.max() / 1e9).isoformat()
         
         return {
-            'total_entries': len(self.embeddings_cache),
+            'total_entries': len(self._row),
             'total_size_mb': total_size / (1024 * 1024),
             'oldest_entry': oldest_entry,
             'newest_entry': newest_entry,
@@ -214,11 +625,18 @@ class CacheManager:
     
     def clear_cache(self) -> None:
         """Полная очистка кэша."""
-        self.embeddings_cache.clear()
-        self.metadata_cache.clear()
+        # Ожидающая запись не должна восстановить удаленные файлы
+        self.flush()
+        
+        self._matrix = None
+        self._sig = None
+        self._cached_at = None
+        self._row.clear()
+        self._rows_used = 0
         
         # Удаление файлов кэша
-        for cache_file in [CACHE_FILE, METADATA_CACHE_FILE]:
+        for cache_file in [CACHE_FILE, EMBEDDINGS_MATRIX_FILE, EMBEDDINGS_SIGNATURES_FILE,
+                           EMBEDDINGS_COMPRESSED_FILE, METADATA_CACHE_FILE]:
             if cache_file.exists():
                 try:
                     cache_file.unlink()
@@ -239,19 +657,24 @@ class CacheManager:
             total_chunks: Общее количество чанков
             processed_files: Список уже обработанных файлов
         """
-        progress_file = CACHE_FILE.parent / f"progress_{hashlib.md5(directory_path.encode()).hexdigest()}.pkl"
-        
-        progress_data = {
-            'directory_path': directory_path,
-            'processed_chunks': processed_chunks,
-            'total_chunks': total_chunks,
-            'processed_files': processed_files,
-            'timestamp': datetime.now().isoformat()
-        }
-        
         try:
-            with open(progress_file, 'wb') as f:
-                pickle.dump(progress_data, f)
+            with self._progress_lock, self._progress_db as db:
+                # Дописываются только новые пути; при новом списке журнал пересоздается
+                written = self._progress_written.get(directory_path, 0)
+                if written > len(processed_files) or written == 0:
+                    written = 0
+                    db.execute("DELETE FROM progress_files WHERE dir_path = ?", (directory_path,))
+                
+                db.executemany(
+                    "INSERT INTO progress_files (dir_path, file_path) VALUES (?, ?)",
+                    ((directory_path, path) for path in processed_files[written:])
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO progress (dir_path, processed_chunks, total_chunks, ts) "
+                    "VALUES (?, ?, ?, ?)",
+                    (directory_path, processed_chunks, total_chunks, time.time())
+                )
+                self._progress_written[directory_path] = len(processed_files)
             logger.info(f"Сохранен прогресс: {processed_chunks}/{total_chunks} чанков")
         except Exception as e:
             logger.error(f"Ошибка при сохранении прогресса: {e}")
@@ -266,15 +689,33 @@ class CacheManager:
         Returns:
             Optional[dict]: Данные о прогрессе или None
         """
-        progress_file = CACHE_FILE.parent / f"progress_{hashlib.md5(directory_path.encode()).hexdigest()}.pkl"
-        
-        if not progress_file.exists():
-            return None
-        
         try:
-            with open(progress_file, 'rb') as f:
-                progress_data = pickle.load(f)
-            logger.info(f"Загружен прогресс: {progress_data['processed_chunks']}/{progress_data['total_chunks']} чанков")
+            with self._progress_lock:
+                row = self._progress_db.execute(
+                    "SELECT processed_chunks, total_chunks, ts FROM progress WHERE dir_path = ?",
+                    (directory_path,)
+                ).fetchone()
+                if row is None:
+                    return None
+                
+                processed_files = [
+                    sys.intern(path) for (path,) in self._progress_db.execute(
+                        "SELECT file_path FROM progress_files WHERE dir_path = ? ORDER BY rowid",
+                        (directory_path,)
+                    )
+                ]
+                self._progress_written[directory_path] = len(processed_files)
+            
+            processed_chunks, total_chunks, ts = row
+            progress_data = {
+                'directory_path': directory_path,
+                'processed_chunks': processed_chunks,
+                'total_chunks': total_chunks,
+                'processed_files': processed_files,
+                'timestamp': datetime.fromtimestamp(ts).isoformat()
+            }
+            
+            logger.info(f"Загружен прогресс: {processed_chunks}/{total_chunks} чанков")
             return progress_data
         except Exception as e:
             logger.error(f"Ошибка при загрузке прогресса: {e}")
@@ -287,14 +728,14 @@ class CacheManager:
         Args:
             directory_path: Путь к директории
         """
-        progress_file = CACHE_FILE.parent / f"progress_{hashlib.md5(directory_path.encode()).hexdigest()}.pkl"
-        
-        if progress_file.exists():
-            try:
-                progress_file.unlink()
-                logger.info("Прогресс чанков очищен")
-            except Exception as e:
-                logger.error(f"Ошибка при очистке прогресса: {e}")
+        try:
+            with self._progress_lock, self._progress_db as db:
+                self._progress_written.pop(directory_path, None)
+                db.execute("DELETE FROM progress_files WHERE dir_path = ?", (directory_path,))
+                db.execute("DELETE FROM progress WHERE dir_path = ?", (directory_path,))
+            logger.info("Прогресс чанков очищен")
+        except Exception as e:
+            logger.error(f"Ошибка при очистке прогресса: {e}")
     
     def get_processed_files_from_chunks(self, processed_files: List[str]) -> set:
         """
@@ -311,26 +752,21 @@ class CacheManager:
     def save_multiple_folders_config(self, folder_paths: List[str], recursive: bool = True) -> None:
         """
         Сохранение конфигурации множественных папок.
+        Папки записываются текстом по одной на строку, флаг рекурсии - в отдельный файл.
         
         Args:
             folder_paths: Список путей к папкам
             recursive: Рекурсивный поиск
         """
-        from config import LAST_FOLDERS_FILE, SAVE_LAST_FOLDERS
+        from config import LAST_FOLDERS_FILE, LAST_FOLDERS_RECURSIVE_FILE, SAVE_LAST_FOLDERS
         
         if not SAVE_LAST_FOLDERS:
             return
         
         try:
-            config_data = {
-                'folder_paths': folder_paths,
-                'recursive': recursive,
-                'saved_at': datetime.now().isoformat()
-            }
-            
             LAST_FOLDERS_FILE.parent.mkdir(exist_ok=True)
-            with open(LAST_FOLDERS_FILE, 'wb') as f:
-                pickle.dump(config_data, f)
+            self._write_atomically(LAST_FOLDERS_FILE, lambda f: f.write("\n".join(folder_paths).encode('utf-8')))
+            self._write_atomically(LAST_FOLDERS_RECURSIVE_FILE, lambda f: f.write(b'1' if recursive else b'0'))
             
             logger.info(f"Сохранена конфигурация для {len(folder_paths)} папок")
         except Exception as e:
@@ -343,25 +779,23 @@ class CacheManager:
         Returns:
             Optional[dict]: Конфигурация папок или None
         """
-        from config import LAST_FOLDERS_FILE, SAVE_LAST_FOLDERS
+        from config import LAST_FOLDERS_FILE, LAST_FOLDERS_RECURSIVE_FILE, SAVE_LAST_FOLDERS
         
         if not SAVE_LAST_FOLDERS or not LAST_FOLDERS_FILE.exists():
             return None
         
         try:
-            with open(LAST_FOLDERS_FILE, 'rb') as f:
-                config_data = pickle.load(f)
+            folder_paths = LAST_FOLDERS_FILE.read_text(encoding='utf-8').splitlines()
+            recursive = True
+            if LAST_FOLDERS_RECURSIVE_FILE.exists():
+                recursive = LAST_FOLDERS_RECURSIVE_FILE.read_text(encoding='utf-8').strip() != '0'
             
             # Проверяем существование папок
-            existing_folders = []
-            for folder_path in config_data.get('folder_paths', []):
-                if os.path.exists(folder_path):
-                    existing_folders.append(folder_path)
+            existing_folders = [folder_path for folder_path in folder_paths if os.path.exists(folder_path)]
             
             if existing_folders:
-                config_data['folder_paths'] = existing_folders
                 logger.info(f"Загружена конфигурация для {len(existing_folders)} папок")
-                return config_data
+                return {'folder_paths': existing_folders, 'recursive': recursive}
             
         except Exception as e:
             logger.error(f"Ошибка при загрузке конфигурации папок: {e}")
@@ -380,7 +814,7 @@ class CacheManager:
         """
         sorted_paths = sorted(folder_paths)
         combined_path = "|".join(sorted_paths)
-        return hashlib.md5(combined_path.encode()).hexdigest()
+        return hashlib.blake2b(combined_path.encode(), digest_size=8).hexdigest()
     
     def clean_old_progress_files(self, max_age_days: int = 7) -> None:
         """
@@ -389,14 +823,26 @@ class CacheManager:
         Args:
             max_age_days: Максимальный возраст файлов в днях
         """
+        cutoff_time = time.time() - (max_age_days * 24 * 3600)
+        
         try:
-            cache_dir = CACHE_FILE.parent
-            cutoff_time = time.time() - (max_age_days * 24 * 3600)
+            with self._progress_lock, self._progress_db as db:
+                db.execute(
+                    "DELETE FROM progress_files WHERE dir_path IN "
+                    "(SELECT dir_path FROM progress WHERE ts < ?)",
+                    (cutoff_time,)
+                )
+                deleted = db.execute("DELETE FROM progress WHERE ts < ?", (cutoff_time,)).rowcount
+            if deleted:
+                logger.info(f"Удалено старых записей прогресса: {deleted}")
             
-            for file_path in cache_dir.glob("progress_*.pkl"):
-                if file_path.stat().st_mtime < cutoff_time:
-                    file_path.unlink()
-                    logger.info(f"Удален старый файл прогресса: {file_path.name}")
+            # Файлы прогресса от предыдущих версий (stat берется из DirEntry)
+            with os.scandir(CACHE_FILE.parent) as entries:
+                for entry in entries:
+                    if (entry.name.startswith('progress_') and entry.is_file()
+                            and entry.stat().st_mtime < cutoff_time):
+                        os.unlink(entry.path)
+                        logger.info(f"Удален старый файл прогресса: {entry.name}")
         
         except Exception as e:
-            logger.error(f"Ошибка при очистке старых файлов прогресса: {e}")
\ No newline at end of file
+            logger.error(f"Ошибка при очистке старых файлов прогресса: {e}")
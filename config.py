@@ -5,6 +5,7 @@
 
 import os
 from pathlib import Path
+from types import MappingProxyType
 
 # Основные настройки приложения
 APP_NAME = "Image Search Assistant"
@@ -15,14 +16,25 @@ SUPPORTED_FORMATS = ['.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG']
 
 # Настройки CLIP модели
 CLIP_MODEL_NAME = "clip-ViT-B-32"  # Модель для анализа изображений
+CLIP_EMBEDDING_DIM = 512  # Размерность эмбеддинга модели
+CLIP_IMAGE_SIZE = 224  # Входное разрешение модели (короткая сторона после предобработки CLIP)
 CLIP_BATCH_SIZE = 32  # Размер батча по умолчанию (уменьшен для экономии памяти)
 CLIP_BATCH_SIZE_CPU = 8  # Размер батча для CPU (уменьшен)
 CLIP_BATCH_SIZE_GPU = 32  # Размер батча для GPU (уменьшен)
+IMAGE_LOADER_WORKERS = min(16, (os.cpu_count() or 4) * 2)  # Потоки загрузки изображений (libjpeg/libpng отпускают GIL)
+CPU_INT8_QUANTIZATION = True  # Динамическая INT8-квантизация линейных слоев модели при работе на CPU
+GPU_TORCH_COMPILE = False  # Компиляция визуальной части через torch.compile на GPU (нужен Triton; прогрев при каждом запуске)
+CUDA_ALLOC_CONF = "expandable_segments:True,max_split_size_mb:128"  # Настройки аллокатора CUDA (против фрагментации)
 
 # Настройки кэширования
 CACHE_DIR = Path("cache")  # Папка для кэша
-CACHE_FILE = CACHE_DIR / "image_embeddings.pkl"  # Файл кэша эмбеддингов
-METADATA_CACHE_FILE = CACHE_DIR / "metadata.pkl"  # Файл кэша метаданных
+CACHE_FILE = CACHE_DIR / "image_embeddings.pkl"  # Индекс путей кэша эмбеддингов
+EMBEDDINGS_MATRIX_FILE = CACHE_DIR / "image_embeddings.npy"  # Матрица эмбеддингов (float32)
+EMBEDDINGS_SIGNATURES_FILE = CACHE_DIR / "image_signatures.npy"  # Сигнатуры файлов (размер, mtime_ns)
+EMBEDDINGS_COMPRESSED_FILE = CACHE_DIR / "image_embeddings.blosc2"  # Сжатая матрица эмбеддингов
+COMPRESS_EMBEDDINGS_CACHE = True  # Сжимать матрицу через blosc2, если он установлен (без отображения в память)
+METADATA_CACHE_FILE = CACHE_DIR / "metadata.npy"  # Время кэширования записей в нс (int64, по строкам матрицы)
+PROGRESS_DB_FILE = CACHE_DIR / "progress.db"  # База прогресса обработки чанков (SQLite)
 
 # Настройки интерфейса
 THUMBNAIL_SIZE = (150, 150)  # Размер миниатюр в результатах поиска
@@ -48,14 +60,15 @@ AUTO_REDUCE_CHUNK_FACTOR = 0.5  # Коэффициент уменьшения ч
 # Настройки множественного выбора папок
 MAX_SELECTED_FOLDERS = 50  # Максимальное количество папок для выбора
 SAVE_LAST_FOLDERS = True  # Сохранять последние выбранные папки
-LAST_FOLDERS_FILE = CACHE_DIR / "last_folders.pkl"  # Файл с последними папками
+LAST_FOLDERS_FILE = CACHE_DIR / "last_folders.txt"  # Последние папки (по одной на строку)
+LAST_FOLDERS_RECURSIVE_FILE = CACHE_DIR / "last_folders_recursive.flag"  # Флаг рекурсивного поиска (1/0)
 DEFAULT_RECURSIVE_SEARCH = True  # Рекурсивный поиск по умолчанию
 
-# Создание необходимых директорий
-CACHE_DIR.mkdir(exist_ok=True)
+# Настройки сохранения фотографий
+PHOTO_SAVE_WORKERS = min(32, (os.cpu_count() or 4) * 4)  # Потоки копирования (операции ввода-вывода отпускают GIL)
 
 # Цвета интерфейса
-COLORS = {
+COLORS = MappingProxyType({
     'bg_primary': '#f0f0f0',
     'bg_secondary': '#ffffff',
     'accent': '#007acc',
@@ -64,11 +77,16 @@ COLORS = {
     'success': '#28a745',
     'warning': '#ffc107',
     'error': '#dc3545'
-}
+})
 
 # Шрифты
-FONTS = {
+FONTS = MappingProxyType({
     'default': ('Segoe UI', 9),
     'header': ('Segoe UI', 12, 'bold'),
     'small': ('Segoe UI', 8)
-}
\ No newline at end of file
+})
+
+
+def ensure_cache_dir() -> None:
+    """Создание папки кэша (вызывается при первом обращении к кэшу, а не при импорте)."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
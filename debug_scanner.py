@@ -6,6 +6,9 @@
 import os
 from pathlib import Path
 
+# Расширения изображений в нижнем регистре для проверки через str.endswith
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
 def debug_directory_scan(directory_path: str):
     """Отладочное сканирование директории."""
     print(f"=== Отладка сканирования директории ===")
@@ -28,47 +31,45 @@ def debug_directory_scan(directory_path: str):
     print()
     
     try:
-        files = os.listdir(directory_path)
-        print(f"Всего файлов в директории: {len(files)}")
-        print()
-        
         image_files = []
         other_files = []
+        total_entries = 0
         
-        for i, file in enumerate(files):
-            file_path = os.path.join(directory_path, file)
-            
-            # Показываем первые 10 файлов для отладки
-            if i < 10:
-                print(f"Файл {i+1}: {file}")
-                print(f"  Полный путь: {file_path}")
-                print(f"  Существует: {os.path.exists(file_path)}")
-                print(f"  Является файлом: {os.path.isfile(file_path)}")
+        # os.scandir отдает тип записи из каталога без отдельного stat на каждый файл
+        with os.scandir(directory_path) as entries:
+            for i, entry in enumerate(entries):
+                total_entries += 1
+                is_file = entry.is_file()
                 
-                if os.path.isfile(file_path):
-                    extension = Path(file).suffix
-                    extension_lower = extension.lower()
-                    print(f"  Расширение: '{extension}'")
-                    print(f"  Расширение (lower): '{extension_lower}'")
-                    print(f"  В поддерживаемых форматах: {extension_lower in [fmt.lower() for fmt in supported_formats]}")
+                # Показываем первые 10 файлов для отладки
+                if i < 10:
+                    print(f"Файл {i+1}: {entry.name}")
+                    print(f"  Полный путь: {entry.path}")
+                    print(f"  Является файлом: {is_file}")
                     
-                    if extension_lower in ['.jpg', '.jpeg', '.png']:
-                        image_files.append(file_path)
-                        print(f"  -> ДОБАВЛЕН как изображение")
+                    if is_file:
+                        extension = os.path.splitext(entry.name)[1]
+                        print(f"  Расширение: '{extension}'")
+                        print(f"  Расширение (lower): '{extension.lower()}'")
+                        
+                        if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            image_files.append(entry.path)
+                            print(f"  -> ДОБАВЛЕН как изображение")
+                        else:
+                            other_files.append(entry.path)
+                            print(f"  -> НЕ изображение")
                     else:
-                        other_files.append(file_path)
-                        print(f"  -> НЕ изображение")
-                else:
-                    print(f"  -> НЕ файл (возможно, папка)")
-                print()
-            else:
-                # Для остальных файлов только быстрая проверка
-                if os.path.isfile(file_path):
-                    extension_lower = Path(file).suffix.lower()
-                    if extension_lower in ['.jpg', '.jpeg', '.png']:
-                        image_files.append(file_path)
+                        print(f"  -> НЕ файл (возможно, папка)")
+                    print()
+                elif is_file:
+                    # Для остальных файлов только быстрая проверка
+                    if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        image_files.append(entry.path)
                     else:
-                        other_files.append(file_path)
+                        other_files.append(entry.path)
+        
+        print(f"Всего файлов в директории: {total_entries}")
+        print()
         
         print(f"=== РЕЗУЛЬТАТЫ ===")
         print(f"Найдено изображений: {len(image_files)}")
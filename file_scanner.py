@@ -4,15 +4,41 @@
 """
 
 import os
-from pathlib import Path
-from typing import List, Optional, Callable
+import re
+from typing import List, Dict, Tuple, Optional, Callable, Iterator, Union
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 
 from config import SUPPORTED_FORMATS
 
 logger = logging.getLogger(__name__)
 
+# Количество потоков обхода папок (нагрузка ограничена вводом-выводом, а не CPU)
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Начиная с этого количества имен, расширения проверяются одним проходом по объединенной строке
+BULK_FILTER_THRESHOLD = 1024
+
+# Минимальный интервал между вызовами progress_callback при сканировании (секунды)
+PROGRESS_INTERVAL = 0.1
+
+# Время жизни закэшированной оценки количества файлов (секунды)
+ESTIMATE_CACHE_TTL = 5.0
+
+def _suffix(file_path: str) -> str:
+    """
+    Расширение файла в нижнем регистре строковыми операциями, без создания Path.
+    
+    Args:
+        file_path: Путь к файлу или его имя
+        
+    Returns:
+        str: Расширение с точкой или пустая строка
+    """
+    return os.path.splitext(file_path)[1].lower()
+
 class FileScanner:
     """
     Класс для сканирования файловой системы и поиска изображений.
@@ -22,6 +48,17 @@ class FileScanner:
     def __init__(self):
         """Инициализация сканера файлов."""
         self.supported_formats = [fmt.lower() for fmt in SUPPORTED_FORMATS]
+        # Одно скомпилированное выражение для всех расширений: проверка без создания строк на каждый файл
+        extensions = sorted({fmt.lstrip('.') for fmt in self.supported_formats})
+        self._ext_re = re.compile(
+            r'\.(?:' + '|'.join(re.escape(ext) for ext in extensions) + r')\Z', re.IGNORECASE
+        )
+        # То же выражение для пакетного отбора: строки объединенного списка имен
+        self._ext_lines_re = re.compile(
+            r'^.*\.(?:' + '|'.join(re.escape(ext) for ext in extensions) + r')$', re.IGNORECASE | re.MULTILINE
+        )
+        # Кэш оценок количества файлов: {(путь, рекурсивно): (время_оценки, количество)}
+        self._estimate_cache: Dict[Tuple[str, bool], Tuple[float, int]] = {}
     
     def scan_directory(self, directory_path: str, 
                       recursive: bool = True,
@@ -35,10 +72,35 @@ class FileScanner:
             recursive: Рекурсивный поиск в подпапках
             date_filter: Фильтр по дате в формате {'days': количество_дней_назад}
             progress_callback: Функция обратного вызова для отслеживания прогресса
+                (при рекурсивном поиске общее количество передается как None)
             
         Returns:
             List[str]: Список путей к найденным изображениям
         """
+        image_files = list(self.iter_images(directory_path, recursive, date_filter, progress_callback))
+        
+        logger.info(f"Найдено {len(image_files)} изображений")
+        return image_files
+    
+    def iter_images(self, directory_path: str, 
+                    recursive: bool = True,
+                    date_filter: Optional[dict] = None,
+                    progress_callback: Optional[Callable] = None) -> Iterator[str]:
+        """
+        Потоковое сканирование директории: пути к изображениям отдаются по мере обнаружения,
+        поэтому обработка может начаться до завершения обхода.
+        Проверка директории выполняется при получении первого элемента.
+        
+        Args:
+            directory_path: Путь к директории для сканирования
+            recursive: Рекурсивный поиск в подпапках
+            date_filter: Фильтр по дате в формате {'days': количество_дней_назад}
+            progress_callback: Функция обратного вызова для отслеживания прогресса
+                (при рекурсивном поиске общее количество передается как None)
+            
+        Yields:
+            str: Путь к найденному изображению
+        """
         # Нормализация пути для Windows
         directory_path = os.path.normpath(directory_path)
         
@@ -51,76 +113,74 @@ class FileScanner:
         logger.info(f"Начало сканирования директории: {directory_path}")
         logger.info(f"Поддерживаемые форматы: {self.supported_formats}")
         
-        image_files = []
         processed_files = 0
+        # Прогресс отправляется не чаще PROGRESS_INTERVAL, независимо от скорости диска
+        last_progress_time = 0.0
         
         # Определяем временной фильтр
         date_threshold = None
         if date_filter and 'days' in date_filter:
-            date_threshold = datetime.now() - timedelta(days=date_filter['days'])
+            # Порог как Unix-время: сравнение с mtime без создания datetime на каждый файл
+            date_threshold = (datetime.now() - timedelta(days=date_filter['days'])).timestamp()
         
         try:
             if recursive:
-                total_files = self._count_files(directory_path)
-                logger.info(f"Всего файлов для проверки: {total_files}")
+                # Проверка уровня логирования вынесена из цикла
+                debug_enabled = logger.isEnabledFor(logging.DEBUG)
                 
-                for root, dirs, files in os.walk(directory_path):
-                    logger.debug(f"Проверка папки: {root}, файлов: {len(files)}")
-                    for file in files:
-                        processed_files += 1
-                        
-                        if progress_callback and processed_files % 100 == 0:
-                            progress_callback(
-                                processed_files, 
-                                total_files, 
-                                f"Сканирование: {processed_files}/{total_files} файлов"
-                            )
-                        
-                        file_path = os.path.join(root, file)
-                        
-                        # Отладочная информация для первых файлов
-                        if len(image_files) < 5:
-                            logger.debug(f"Проверка файла: {file}")
-                            logger.debug(f"Расширение: {Path(file).suffix.lower()}")
-                            logger.debug(f"Является изображением: {self._is_image_file(file_path)}")
-                        
-                        if self._is_image_file(file_path) and self._passes_date_filter(file_path, date_threshold):
-                            image_files.append(file_path)
+                # Общее число файлов заранее неизвестно: отдельный проход ради него удваивал бы обход
+                for folder_path, folder_images, folder_files in self._parallel_walk(directory_path, date_threshold):
+                    if debug_enabled:
+                        logger.debug(f"Проверка папки: {folder_path}, файлов: {folder_files}")
+                    processed_files += folder_files
+                    
+                    if progress_callback and time.monotonic() - last_progress_time >= PROGRESS_INTERVAL:
+                        last_progress_time = time.monotonic()
+                        progress_callback(
+                            processed_files, 
+                            None, 
+                            f"Сканирование: проверено {processed_files} файлов"
+                        )
+                    
+                    if debug_enabled:
+                        for file_path in folder_images:
                             logger.debug(f"Добавлен файл: {file_path}")
+                    yield from folder_images
             else:
-                files = os.listdir(directory_path)
-                total_files = len(files)
+                # Тип записи и stat берутся из os.scandir, без отдельных isfile/getmtime
+                with os.scandir(directory_path) as it:
+                    entries = {entry.name: entry for entry in it}
+                total_files = len(entries)
                 logger.info(f"Файлов в директории: {total_files}")
                 
-                for i, file in enumerate(files):
-                    if progress_callback and i % 50 == 0:
-                        progress_callback(
-                            i, 
-                            total_files, 
-                            f"Сканирование: {i}/{total_files} файлов"
-                        )
-                    
-                    file_path = os.path.join(directory_path, file)
-                    
-                    # Отладочная информация для первых файлов
-                    if i < 5:
-                        logger.info(f"Проверка файла: {file}")
-                        logger.info(f"Полный путь: {file_path}")
-                        logger.info(f"Существует файл: {os.path.isfile(file_path)}")
-                        logger.info(f"Расширение: {Path(file).suffix.lower()}")
-                        logger.info(f"Является изображением: {self._is_image_file(file_path)}")
-                    
-                    if (os.path.isfile(file_path) and 
-                        self._is_image_file(file_path) and 
-                        self._passes_date_filter(file_path, date_threshold)):
-                        image_files.append(file_path)
+                # Сначала отбор по расширению, затем проверка типа только для кандидатов
+                candidates = self._filter_image_names(list(entries))
+                
+                if progress_callback:
+                    progress_callback(
+                        0, 
+                        len(candidates), 
+                        f"Сканирование: 0/{len(candidates)} файлов"
+                    )
+                
+                # Тип записи уже известен из каталога: список собирается одним выражением
+                image_entries = [entries[name] for name in candidates if self._entry_is_file(entries[name])]
+                
+                # Даты проверяются одним пакетом после отбора по расширению
+                result = [entry.path for entry in self._filter_by_date_batch(image_entries, date_threshold)]
+                
+                if progress_callback:
+                    progress_callback(
+                        len(result), 
+                        len(candidates), 
+                        f"Сканирование: {len(result)}/{len(candidates)} файлов"
+                    )
+                
+                yield from result
         
         except Exception as e:
             logger.error(f"Ошибка при сканировании директории: {e}")
             raise
-        
-        logger.info(f"Найдено {len(image_files)} изображений")
-        return image_files
     
     def _count_files(self, directory_path: str) -> int:
         """
@@ -134,35 +194,186 @@ class FileScanner:
         """
         total = 0
         try:
-            for root, dirs, files in os.walk(directory_path):
-                total += len(files)
+            for _ in self._iter_file_entries(directory_path):
+                total += 1
         except Exception:
             return 0
         return total
     
+    def _parallel_walk(self, directory_path: str, date_threshold: Optional[float],
+                       workers: int = SCAN_WORKERS) -> Iterator[Tuple[str, List[str], int]]:
+        """
+        Многопоточный обход дерева папок.
+        Чтение каталогов и stat освобождают GIL, поэтому папки читаются параллельно.
+        
+        Args:
+            directory_path: Путь к корневой директории
+            date_threshold: Пороговое время модификации (Unix-время) для фильтрации
+            workers: Количество потоков
+            
+        Yields:
+            Tuple[str, List[str], int]: (папка, найденные изображения, количество файлов в папке)
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(self._scan_single_directory, directory_path, date_threshold)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_path, folder_images, folder_files, subdirs = future.result()
+                    for subdir in subdirs:
+                        pending.add(executor.submit(self._scan_single_directory, subdir, date_threshold))
+                    yield folder_path, folder_images, folder_files
+    
+    def _scan_single_directory(self, directory_path: str, 
+                               date_threshold: Optional[float]) -> Tuple[str, List[str], int, List[str]]:
+        """
+        Сканирование одной папки без рекурсии (выполняется в потоке обхода).
+        
+        Args:
+            directory_path: Путь к папке
+            date_threshold: Пороговое время модификации (Unix-время) для фильтрации
+            
+        Returns:
+            Tuple[str, List[str], int, List[str]]: (папка, изображения, количество файлов, подпапки)
+        """
+        image_files = []
+        subdirs = []
+        file_count = 0
+        # Поиск по расширению связывается локально: отказ для не-изображений — один вызов C-кода
+        match_extension = self._ext_re.search
+        try:
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    
+                    if is_dir:
+                        # Символические ссылки на папки не обходятся (как в os.walk по умолчанию)
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    
+                    file_count += 1
+                    # Запись каталога передается целиком: stat выполняется не более одного раза
+                    if match_extension(entry.name) is not None and self._passes_date_filter(entry, date_threshold):
+                        image_files.append(entry.path)
+        except OSError as e:
+            logger.debug(f"Не удалось прочитать папку {directory_path}: {e}")
+        
+        return directory_path, image_files, file_count, subdirs
+    
+    @staticmethod
+    def _entry_is_file(entry: os.DirEntry) -> bool:
+        """
+        Проверка, что запись каталога является файлом.
+        
+        Args:
+            entry: Запись os.scandir
+            
+        Returns:
+            bool: True если запись является файлом
+        """
+        try:
+            return entry.is_file()
+        except OSError:
+            return False
+    
+    def _iter_file_entries(self, directory_path: str) -> Iterator[os.DirEntry]:
+        """
+        Рекурсивный обход директории через os.scandir с явным стеком.
+        Тип записи берется из каталога, без отдельного stat для каждого файла.
+        
+        Args:
+            directory_path: Путь к директории
+            
+        Yields:
+            os.DirEntry: Записи файлов (все, что не является папкой, как в os.walk)
+        """
+        stack = [directory_path]
+        while stack:
+            current = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        
+                        if is_dir:
+                            # Символические ссылки на папки не обходятся (как в os.walk по умолчанию)
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        else:
+                            yield entry
+            except OSError as e:
+                logger.debug(f"Не удалось прочитать папку {current}: {e}")
+            
+            # Сохраняем порядок обхода сверху вниз, как в os.walk
+            stack.extend(reversed(subdirs))
+    
     def _is_image_file(self, file_path: str) -> bool:
         """
         Проверка, является ли файл изображением поддерживаемого формата.
         
         Args:
-            file_path: Путь к файлу
+            file_path: Имя файла или путь к нему
             
         Returns:
             bool: True если файл является поддерживаемым изображением
         """
-        try:
-            file_extension = Path(file_path).suffix.lower()
-            return file_extension in self.supported_formats
-        except Exception:
-            return False
+        return self._ext_re.search(file_path) is not None
+    
+    def _filter_image_names(self, names: List[str]) -> List[str]:
+        """
+        Отбор имен файлов с поддерживаемыми расширениями.
+        Большие списки проверяются одним проходом регулярного выражения по объединенной строке.
+        
+        Args:
+            names: Имена файлов
+            
+        Returns:
+            List[str]: Имена изображений в исходном порядке
+        """
+        if len(names) > BULK_FILTER_THRESHOLD:
+            joined = '\n'.join(names)
+            # Имя с переводом строки разбило бы объединенную строку: тогда проверяем по одному
+            if joined.count('\n') == len(names) - 1:
+                return self._ext_lines_re.findall(joined)
+        
+        return [name for name in names if self._is_image_file(name)]
     
-    def _passes_date_filter(self, file_path: str, date_threshold: Optional[datetime]) -> bool:
+    def _filter_by_date_batch(self, file_paths: List[Union[str, os.DirEntry]], 
+                              date_threshold: Optional[float]) -> List[Union[str, os.DirEntry]]:
+        """
+        Пакетная фильтрация файлов по дате: stat выполняется параллельно в пуле потоков.
+        
+        Args:
+            file_paths: Список путей к файлам или записей os.scandir
+            date_threshold: Пороговое время модификации (Unix-время) для фильтрации
+            
+        Returns:
+            List[Union[str, os.DirEntry]]: Файлы, прошедшие фильтр, в исходном порядке
+        """
+        if date_threshold is None or not file_paths:
+            return file_paths
+        
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+            passed = list(executor.map(lambda path: self._passes_date_filter(path, date_threshold), file_paths))
+        
+        return [path for path, ok in zip(file_paths, passed) if ok]
+    
+    def _passes_date_filter(self, file_path: Union[str, os.DirEntry], 
+                           date_threshold: Optional[float]) -> bool:
         """
         Проверка соответствия файла фильтру по дате.
         
         Args:
-            file_path: Путь к файлу
-            date_threshold: Пороговая дата для фильтрации
+            file_path: Путь к файлу или запись os.scandir (используется ее кэшированный stat)
+            date_threshold: Пороговое время модификации (Unix-время) для фильтрации
             
         Returns:
             bool: True если файл проходит фильтр по дате
@@ -171,33 +382,39 @@ class FileScanner:
             return True
         
         try:
-            # Получаем дату модификации файла
-            modification_time = os.path.getmtime(file_path)
-            file_date = datetime.fromtimestamp(modification_time)
-            return file_date >= date_threshold
+            # Получаем дату модификации файла. У записи os.scandir stat кэшируется на время ее жизни:
+            # в Windows он уже заполнен при чтении каталога, в Linux выполняется один раз
+            if isinstance(file_path, os.DirEntry):
+                modification_time = file_path.stat().st_mtime
+            else:
+                modification_time = os.path.getmtime(file_path)
+            return modification_time >= date_threshold
         except Exception:
             # Если не можем получить дату, включаем файл
             return True
     
-    def get_file_info(self, file_path: str) -> dict:
+    def get_file_info(self, file_path: str, stat: Optional[os.stat_result] = None) -> dict:
         """
         Получение информации о файле.
         
         Args:
             file_path: Путь к файлу
+            stat: Уже полученный результат os.stat (чтобы не выполнять его повторно)
             
         Returns:
             dict: Словарь с информацией о файле
         """
+        extension = _suffix(file_path) if file_path else ''
         try:
-            stat = os.stat(file_path)
+            if stat is None:
+                stat = os.stat(file_path)
             return {
                 'path': file_path,
                 'name': os.path.basename(file_path),
                 'size': stat.st_size,
                 'modification_time': datetime.fromtimestamp(stat.st_mtime),
                 'creation_time': datetime.fromtimestamp(stat.st_ctime),
-                'extension': Path(file_path).suffix.lower()
+                'extension': extension
             }
         except Exception as e:
             logger.error(f"Ошибка при получении информации о файле {file_path}: {e}")
@@ -207,7 +424,7 @@ class FileScanner:
                 'size': 0,
                 'modification_time': datetime.now(),
                 'creation_time': datetime.now(),
-                'extension': Path(file_path).suffix.lower() if file_path else ''
+                'extension': extension
             }
     
     def validate_directory(self, directory_path: str) -> tuple:
@@ -230,8 +447,10 @@ class FileScanner:
             return False, f"Указанный путь не является директорией: {directory_path}"
         
         try:
-            # Проверяем права доступа
-            os.listdir(directory_path)
+            # Проверяем права доступа: достаточно открыть каталог, читать все имена не нужно.
+            # Дескриптор закрывается сразу, чтобы не блокировать папку в Windows
+            with os.scandir(directory_path):
+                pass
         except PermissionError:
             return False, f"Нет прав доступа к директории: {directory_path}"
         except Exception as e:
@@ -251,7 +470,14 @@ class FileScanner:
             dict: Оценочная информация о сканировании
         """
         try:
-            file_count = self._count_files(directory_path) if recursive else len(os.listdir(directory_path))
+            key = (directory_path, recursive)
+            now = time.monotonic()
+            cached = self._estimate_cache.get(key)
+            if cached is not None and now - cached[0] < ESTIMATE_CACHE_TTL:
+                file_count = cached[1]
+            else:
+                file_count = self._count_files(directory_path) if recursive else len(os.listdir(directory_path))
+                self._estimate_cache[key] = (now, file_count)
             
             # Примерная оценка: 1000 файлов в секунду
             estimated_seconds = max(1, file_count / 1000)
@@ -6,6 +6,33 @@
 import subprocess
 import sys
 
+# Опциональная зависимость: прямой доступ к NVML вместо запуска nvidia-smi
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+# Свойства GPU, уже полученные от PyTorch: {индекс: (имя, память_ГБ, compute_capability)}
+_gpu_info = {}
+
+def _get_gpu_info(torch, index: int) -> tuple:
+    """
+    Получение свойств GPU с кэшированием на уровне модуля.
+    
+    Args:
+        torch: Модуль PyTorch
+        index: Индекс GPU
+        
+    Returns:
+        tuple: (имя, память в ГБ, compute capability)
+    """
+    info = _gpu_info.get(index)
+    if info is None:
+        props = torch.cuda.get_device_properties(index)
+        info = (props.name, props.total_memory / 1024**3, f"{props.major}.{props.minor}")
+        _gpu_info[index] = info
+    return info
+
 def check_gpu_support():
     """Проверка текущей поддержки GPU."""
     print("=== ПРОВЕРКА GPU ПОДДЕРЖКИ ===")
@@ -22,10 +49,7 @@ def check_gpu_support():
             print(f"Количество GPU: {device_count}")
             
             for i in range(device_count):
-                gpu_name = torch.cuda.get_device_name(i)
-                props = torch.cuda.get_device_properties(i)
-                memory_gb = props.total_memory / 1024**3
-                compute_capability = f"{props.major}.{props.minor}"
+                gpu_name, memory_gb, compute_capability = _get_gpu_info(torch, i)
                 
                 print(f"GPU {i}: {gpu_name}")
                 print(f"  Память: {memory_gb:.1f} ГБ")
@@ -75,6 +99,33 @@ def install_cuda_pytorch():
         print("❌ Ошибка при установке PyTorch с CUDA")
         return False
 
+def _time_gpu_matmul(torch, a, b, warmup_iterations: int) -> float:
+    """
+    Замер времени умножения матриц на GPU.
+    
+    Args:
+        torch: Модуль PyTorch
+        a: Первая матрица на GPU
+        b: Вторая матрица на GPU
+        warmup_iterations: Количество прогревочных умножений
+        
+    Returns:
+        float: Время умножения в секундах
+    """
+    # Прогрев: инициализация cuBLAS и загрузка ядер не должны попадать в замер
+    for _ in range(warmup_iterations):
+        torch.mm(a, b)
+    torch.cuda.synchronize()
+    
+    # Замер по событиям CUDA, то есть по времени выполнения на самом GPU
+    start_event = torch.cuda.Event(enable_timing=True)
+    end_event = torch.cuda.Event(enable_timing=True)
+    start_event.record()
+    torch.mm(a, b)
+    end_event.record()
+    torch.cuda.synchronize()
+    return start_event.elapsed_time(end_event) / 1000
+
 def test_gpu_performance():
     """Тест производительности GPU."""
     print("\n=== ТЕСТ ПРОИЗВОДИТЕЛЬНОСТИ GPU ===")
@@ -90,31 +141,36 @@ def test_gpu_performance():
         device = torch.device('cuda')
         print(f"Тестирование на: {torch.cuda.get_device_name(0)}")
         
-        # Тест скорости вычислений
-        size = 1000
+        # Тест скорости вычислений: размер достаточен, чтобы время определялось вычислениями, а не запуском ядра
+        size = 4096
+        warmup_iterations = 3
         print(f"Создание матриц {size}x{size}...")
         
-        # CPU тест
-        start_time = time.time()
+        # CPU тест (замеряется только умножение)
         a_cpu = torch.randn(size, size)
         b_cpu = torch.randn(size, size)
+        start_time = time.perf_counter()
         c_cpu = torch.mm(a_cpu, b_cpu)
-        cpu_time = time.time() - start_time
+        cpu_time = time.perf_counter() - start_time
         
-        # GPU тест
-        start_time = time.time()
+        # GPU тест: честный FP32 (TF32 на время замера отключается) и FP16 на тензорных ядрах
+        allow_tf32 = torch.backends.cuda.matmul.allow_tf32
+        torch.backends.cuda.matmul.allow_tf32 = False
         a_gpu = torch.randn(size, size, device=device)
         b_gpu = torch.randn(size, size, device=device)
-        torch.cuda.synchronize()  # Ждем завершения операций
+        try:
+            gpu_time = _time_gpu_matmul(torch, a_gpu, b_gpu, warmup_iterations)
+        finally:
+            torch.backends.cuda.matmul.allow_tf32 = allow_tf32
         
-        start_compute = time.time()
-        c_gpu = torch.mm(a_gpu, b_gpu)
-        torch.cuda.synchronize()
-        gpu_time = time.time() - start_compute
+        # Тензоры уже в FP16: autocast не нужен
+        gpu_half_time = _time_gpu_matmul(torch, a_gpu.half(), b_gpu.half(), warmup_iterations)
         
         print(f"CPU время: {cpu_time:.3f} сек")
-        print(f"GPU время: {gpu_time:.3f} сек")
-        print(f"Ускорение: {cpu_time/gpu_time:.1f}x")
+        print(f"GPU время (FP32): {gpu_time:.3f} сек")
+        print(f"GPU время (FP16): {gpu_half_time:.3f} сек")
+        print(f"Ускорение FP32: {cpu_time/gpu_time:.1f}x")
+        print(f"Ускорение FP16 (как при работе модели): {cpu_time/gpu_half_time:.1f}x")
         
         # Проверка памяти GPU
         memory_allocated = torch.cuda.memory_allocated() / 1024**2
@@ -129,6 +185,29 @@ def check_nvidia_driver():
     """Проверка драйвера NVIDIA."""
     print("\n=== ПРОВЕРКА ДРАЙВЕРА NVIDIA ===")
     
+    if pynvml is not None:
+        try:
+            pynvml.nvmlInit()
+            try:
+                driver_version = pynvml.nvmlSystemGetDriverVersion()
+                if isinstance(driver_version, bytes):
+                    driver_version = driver_version.decode()
+                
+                print("✅ Драйвер NVIDIA установлен:")
+                print(f"Версия драйвера: {driver_version}")
+                for i in range(pynvml.nvmlDeviceGetCount()):
+                    handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                    gpu_name = pynvml.nvmlDeviceGetName(handle)
+                    if isinstance(gpu_name, bytes):
+                        gpu_name = gpu_name.decode()
+                    memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
+                    print(f"GPU {i}: {gpu_name}, память: {memory.total / 1024**3:.1f} ГБ")
+            finally:
+                pynvml.nvmlShutdown()
+            return
+        except pynvml.NVMLError as e:
+            print(f"⚠️ NVML недоступен ({e}), проверка через nvidia-smi")
+    
     try:
         result = subprocess.run(["nvidia-smi"], capture_output=True, text=True)
         if result.returncode == 0:
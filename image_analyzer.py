@@ -3,20 +3,52 @@
 Обеспечивает создание эмбеддингов изображений и текстовых запросов.
 """
 
+import contextlib
+import importlib.util
+import os
+import sys
+import threading
+
+from config import CUDA_ALLOC_CONF
+
+# Аллокатор CUDA читает настройки при первой инициализации, поэтому они задаются до импорта torch.
+# Расширяемые сегменты снижают фрагментацию памяти при батчах разного размера
+os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', CUDA_ALLOC_CONF)
+
 import torch
 import numpy as np
 from PIL import Image
 from sentence_transformers import SentenceTransformer
 import warnings
-from typing import List, Union, Optional
+from typing import Iterable, Iterator, List, Tuple, Union, Optional
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from config import CLIP_MODEL_NAME, CLIP_BATCH_SIZE_CPU, CLIP_BATCH_SIZE_GPU
+try:
+    import turbojpeg
+except ImportError:  # pragma: no cover - ускоренное декодирование JPEG опционально
+    turbojpeg = None
+
+from config import (CLIP_MODEL_NAME, CLIP_BATCH_SIZE_CPU, CLIP_BATCH_SIZE_GPU, IMAGE_LOADER_WORKERS,
+                   CLIP_IMAGE_SIZE, CLIP_EMBEDDING_DIM, CPU_INT8_QUANTIZATION, GPU_TORCH_COMPILE)
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Подавление предупреждений (один раз при импорте модуля)
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+# Размер батча для кодирования текстовых запросов
+TEXT_BATCH_SIZE = 64
+
+# Сколько батчей изображений загружается заранее, пока кодируется текущий
+IMAGE_PREFETCH_BATCHES = 2
+
+# Декодер libjpeg-turbo не потокобезопасен, поэтому создается лениво в каждом потоке загрузки
+_jpeg_local = threading.local()
+
 class ImageAnalyzer:
     """
     Класс для анализа изображений с использованием CLIP модели.
@@ -27,8 +59,25 @@ class ImageAnalyzer:
         """Инициализация анализатора изображений."""
         self.model = None
         self.device = None
+        # Отдельный CUDA-поток для асинхронного копирования батчей на GPU
+        self._copy_stream = None
+        # Закрепленные буферы хоста, переиспользуемые между батчами, и событие завершения их копирования
+        self._pinned_buffers = {}
+        self._copy_done = None
+        # Подготовка вызывается и из потока предзагрузки, и из основного (повтор при нехватке памяти)
+        self._staging_lock = threading.Lock()
+        # Закрепленный буфер результатов encode_images, переиспользуемый между вызовами (только GPU)
+        self._output_pinned = None
+        # Пул потоков декодирования изображений (без отдельных процессов, что важно для Windows)
+        self._io_pool = ThreadPoolExecutor(max_workers=IMAGE_LOADER_WORKERS)
         self._initialize_model()
     
+    def __del__(self):
+        """Остановка пула потоков загрузки изображений."""
+        io_pool = getattr(self, '_io_pool', None)
+        if io_pool is not None:
+            io_pool.shutdown(wait=False)
+    
     def _initialize_model(self) -> None:
         """
         Инициализация CLIP модели.
@@ -47,17 +96,25 @@ class ImageAnalyzer:
             
             logger.info(f"Используется устройство: {self.device}")
             
-            # Подавление предупреждений
-            warnings.filterwarnings("ignore", category=FutureWarning)
-            
             # Загрузка модели
             logger.info(f"Загрузка модели {CLIP_MODEL_NAME}...")
             self.model = SentenceTransformer(CLIP_MODEL_NAME, device=self.device)
+            # Модель вызывается напрямую (не через encode), поэтому режим инференса включаем явно
+            self.model.eval()
             
             # Дополнительная оптимизация для GPU
             if self.device == 'cuda':
                 torch.backends.cudnn.benchmark = True  # Оптимизация для фиксированных размеров
                 logger.info("Включена оптимизация cuDNN")
+                # TF32 на тензорных ядрах Ampere+ для операций, оставшихся в FP32 вне autocast
+                torch.set_float32_matmul_precision('high')
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
+                self._copy_stream = torch.cuda.Stream()
+                self._copy_done = torch.cuda.Event()
+                self._compile_for_gpu()
+            else:
+                self._quantize_for_cpu()
             
             logger.info("Модель успешно загружена")
             
@@ -68,13 +125,174 @@ class ImageAnalyzer:
                 logger.warning("Падение назад на CPU из-за ошибки GPU")
                 self.device = 'cpu'
                 try:
+                    self._copy_stream = None
+                    self._copy_done = None
                     self.model = SentenceTransformer(CLIP_MODEL_NAME, device=self.device)
+                    self.model.eval()
+                    self._quantize_for_cpu()
                     logger.info("Модель успешно загружена на CPU")
                 except Exception as e2:
                     raise RuntimeError(f"Не удалось загрузить модель даже на CPU: {e2}")
             else:
                 raise RuntimeError(f"Не удалось загрузить модель CLIP: {e}")
     
+    def _quantize_for_cpu(self) -> None:
+        """
+        Динамическая INT8-квантизация линейных слоев модели для CPU.
+        Веса хранятся в INT8, умножения выполняются целочисленными ядрами (VNNI/AVX2).
+        """
+        if not CPU_INT8_QUANTIZATION:
+            return
+        
+        try:
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Модель квантизована в INT8 для CPU")
+        except Exception as e:
+            logger.warning(f"Не удалось квантизовать модель, используется FP32: {e}")
+    
+    def _compile_for_gpu(self) -> None:
+        """
+        Компиляция визуальной части CLIP через torch.compile (режим reduce-overhead, CUDA graphs).
+        Входы модели всегда имеют размер CLIP_IMAGE_SIZE, поэтому граф захватывается один раз
+        на прогреве батчем рабочего размера. При ошибке используется некомпилированная модель.
+        Включается настройкой GPU_TORCH_COMPILE; без Triton (в том числе в Windows) не выполняется.
+        """
+        if not GPU_TORCH_COMPILE or not hasattr(torch, 'compile'):
+            return
+        if sys.platform == 'win32' or importlib.util.find_spec('triton') is None:
+            logger.info("Triton недоступен, torch.compile не используется")
+            return
+        
+        clip_module = self.model[0]
+        transformer = getattr(clip_module, 'model', None)
+        vision_model = getattr(transformer, 'vision_model', None)
+        if vision_model is None:
+            return
+        
+        try:
+            transformer.vision_model = torch.compile(vision_model, mode='reduce-overhead', fullgraph=False)
+            # Прогрев: компиляция и захват графа выполняются на первом вызове
+            dummy_image = Image.new('RGB', (CLIP_IMAGE_SIZE, CLIP_IMAGE_SIZE))
+            self._encode([dummy_image] * CLIP_BATCH_SIZE_GPU)
+            logger.info("Визуальная часть модели скомпилирована torch.compile")
+        except Exception as e:
+            transformer.vision_model = vision_model
+            logger.warning(f"torch.compile недоступен, используется обычный режим: {e}")
+    
+    def _prepare_features(self, inputs: list) -> dict:
+        """
+        Подготовка входных тензоров батча (процессор модели) и их асинхронная передача на устройство.
+        На GPU данные копируются в переиспользуемые закрепленные буферы и оттуда
+        передаются на устройство в отдельном CUDA-потоке.
+        
+        Args:
+            inputs: Список изображений или строк
+            
+        Returns:
+            dict: Входные данные модели на целевом устройстве
+        """
+        features = self.model.tokenize(inputs)
+        if self._copy_stream is None:
+            return features
+        
+        with self._staging_lock, torch.cuda.stream(self._copy_stream):
+            # Буферы перезаписываются только после завершения предыдущего копирования из них
+            self._copy_done.synchronize()
+            features = {
+                key: self._stage_pinned(key, value).to(self.device, non_blocking=True)
+                if isinstance(value, torch.Tensor) else value
+                for key, value in features.items()
+            }
+            self._copy_done.record()
+            return features
+    
+    def _stage_pinned(self, key: str, value: torch.Tensor) -> torch.Tensor:
+        """
+        Копирование тензора в закрепленный буфер хоста, выделяемый один раз на ключ входа.
+        Буфер пересоздается только при изменении формы элемента, типа или превышении емкости.
+        
+        Args:
+            key: Имя входа модели (например, pixel_values)
+            value: Тензор батча в обычной памяти
+            
+        Returns:
+            torch.Tensor: Срез закрепленного буфера с данными батча
+        """
+        buffer = self._pinned_buffers.get(key)
+        if (buffer is None or buffer.dtype != value.dtype
+                or buffer.shape[1:] != value.shape[1:] or len(buffer) < len(value)):
+            capacity = max(len(value), CLIP_BATCH_SIZE_GPU)
+            buffer = torch.empty((capacity, *value.shape[1:]), dtype=value.dtype, pin_memory=True)
+            self._pinned_buffers[key] = buffer
+        
+        staged = buffer[:len(value)]
+        staged.copy_(value)
+        return staged
+    
+    def _encode_features(self, features: dict) -> torch.Tensor:
+        """
+        Кодирование подготовленного батча моделью без отслеживания градиентов.
+        На GPU используется autocast в FP16 (тензорные ядра); нормализация выполняется
+        один раз уже в float32, чтобы не терять точность косинусного сходства.
+        Результат остается на устройстве, копирование в память хоста выполняет вызывающий код.
+        
+        Args:
+            features: Результат _prepare_features
+            
+        Returns:
+            torch.Tensor: Нормализованные эмбеддинги (float32) на устройстве модели
+        """
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(torch.inference_mode())
+            if self._copy_stream is not None:
+                # Вычисления начинаются только после завершения копирования батча
+                current_stream = torch.cuda.current_stream()
+                current_stream.wait_stream(self._copy_stream)
+                for value in features.values():
+                    if isinstance(value, torch.Tensor):
+                        value.record_stream(current_stream)
+                stack.enter_context(torch.autocast(device_type='cuda', dtype=torch.float16))
+            
+            output = self.model(features)
+            embeddings = output['sentence_embedding'].float()
+            return torch.nn.functional.normalize(embeddings, dim=1)
+    
+    def _encode(self, inputs: list) -> torch.Tensor:
+        """
+        Кодирование батча изображений или строк.
+        
+        Args:
+            inputs: Список изображений или строк
+            
+        Returns:
+            torch.Tensor: Нормализованные эмбеддинги (float32) на устройстве модели
+        """
+        return self._encode_features(self._prepare_features(inputs))
+    
+    def _prefetch_features(self, batches: Iterable[List[Image.Image]]):
+        """
+        Конвейер батчей: пока модель кодирует текущий батч, следующий уже
+        проходит через процессор и копируется на устройство в фоновом потоке.
+        
+        Args:
+            batches: Батчи загруженных изображений
+            
+        Yields:
+            tuple: (номер батча, изображения батча, Future с подготовленными данными или None)
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
+            for batch_number, batch_images in enumerate(batches):
+                future = executor.submit(self._prepare_features, batch_images) if batch_images else None
+                if pending is not None:
+                    yield pending
+                pending = (batch_number, batch_images, future)
+            
+            if pending is not None:
+                yield pending
+    
     def encode_images(self, image_paths: List[str], 
                      progress_callback: Optional[callable] = None) -> np.ndarray:
         """
@@ -93,174 +311,158 @@ class ImageAnalyzer:
         if not image_paths:
             return np.array([])
         
-        # Определяем размер батча в зависимости от доступной памяти
-        import psutil
-        available_memory_gb = psutil.virtual_memory().available / (1024**3)
+        batch_size = CLIP_BATCH_SIZE_GPU if self.device == 'cuda' else CLIP_BATCH_SIZE_CPU
+        logger.info(f"Обработка {len(image_paths)} изображений батчами по {batch_size} (устройство: {self.device})")
         
-        # Уменьшаем размер батча при нехватке памяти
-        if available_memory_gb < 2.0:
-            batch_size = 8  # Очень маленький батч для слабых систем
-        elif available_memory_gb < 4.0:
-            batch_size = 16  # Средний батч
-        else:
-            batch_size = CLIP_BATCH_SIZE_GPU if self.device == 'cuda' else CLIP_BATCH_SIZE_CPU
+        # Результат собирается в одном буфере (на GPU - в переиспользуемом закрепленном); батчи
+        # копируются в него с устройства асинхронно, без синхронизации на каждом батче
+        embedding_dim = self.model.get_sentence_embedding_dimension() or CLIP_EMBEDDING_DIM
+        embeddings = self._output_buffer(len(image_paths), embedding_dim)
+        write_pos = 0
+        total_batches = (len(image_paths) + batch_size - 1) // batch_size
         
-        # Дополнительно уменьшаем батч для GPU при больших изображениях
-        if self.device == 'cuda' and len(image_paths) > 1000:
-            batch_size = min(batch_size, 32)
+        for batch_number, batch_embeddings in self._iter_batch_embeddings(image_paths, batch_size):
+            embeddings[write_pos:write_pos + len(batch_embeddings)].copy_(batch_embeddings, non_blocking=True)
+            write_pos += len(batch_embeddings)
+            
+            if progress_callback:
+                current_batch = batch_number + 1
+                progress_callback(
+                    current_batch, 
+                    total_batches, 
+                    f"Обработка батча {current_batch}/{total_batches} на {self.device.upper()} ({write_pos}/{len(image_paths)})"
+                )
         
-        logger.info(f"Обработка {len(image_paths)} изображений батчами по {batch_size} (устройство: {self.device}, память: {available_memory_gb:.1f} ГБ)")
+        if self.device == 'cuda':
+            # Дожидаемся завершения асинхронных копирований в память хоста
+            torch.cuda.synchronize()
         
-        embeddings = []
-        processed_count = 0
-        total_batches = (len(image_paths) + batch_size - 1) // batch_size
+        if write_pos:
+            logger.info(f"Успешно создано {write_pos} эмбеддингов")
+            result = embeddings[:write_pos].numpy()
+            # Закрепленный буфер переиспользуется: наружу отдается копия в обычной памяти
+            return result.copy() if embeddings.is_pinned() else result
+        else:
+            logger.warning("Не удалось создать ни одного эмбеддинга")
+            return np.array([])
+    
+    def _output_buffer(self, rows: int, embedding_dim: int) -> torch.Tensor:
+        """
+        Буфер результатов encode_images. На GPU это закрепленный буфер, который растет
+        по необходимости и переиспользуется, чтобы закрепленная память не росла с размером индекса.
         
-        for batch_idx in range(0, len(image_paths), batch_size):
-            batch_paths = image_paths[batch_idx:batch_idx + batch_size]
-            
-            # Загружаем и обрабатываем только текущий батч
-            batch_images = []
-            valid_batch_paths = []
+        Args:
+            rows: Требуемое число строк
+            embedding_dim: Размерность эмбеддинга
             
-            for path in batch_paths:
-                try:
-                    image = self._load_and_preprocess_image(path)
-                    batch_images.append(image)
-                    valid_batch_paths.append(path)
-                    
-                except Exception as e:
-                    logger.warning(f"Не удалось загрузить изображение {path}: {e}")
-                    continue
+        Returns:
+            torch.Tensor: Тензор не меньше (rows, embedding_dim)
+        """
+        if self.device != 'cuda':
+            return torch.empty((rows, embedding_dim), dtype=torch.float32)
+        
+        buffer = self._output_pinned
+        if buffer is None or buffer.shape[0] < rows or buffer.shape[1] != embedding_dim:
+            buffer = torch.empty((rows, embedding_dim), dtype=torch.float32, pin_memory=True)
+            self._output_pinned = buffer
+        return buffer
+    
+    def _iter_batch_embeddings(self, image_paths: List[str], batch_size: int) -> Iterator[Tuple[int, torch.Tensor]]:
+        """
+        Генератор эмбеддингов по батчам: загрузка в пуле потоков, подготовка следующего батча
+        параллельно с кодированием текущего и уменьшение размера батча при нехватке памяти.
+        Ошибочные батчи пропускаются с записью в лог.
+        
+        Args:
+            image_paths: Список путей к изображениям
+            batch_size: Начальный размер батча
             
+        Yields:
+            Tuple[int, torch.Tensor]: Номер батча и его эмбеддинги на устройстве
+        """
+        batches = self._iter_image_batches(image_paths, batch_size)
+        
+        encode_batch_size = batch_size
+        for batch_number, batch_images, features_future in self._prefetch_features(batches):
             if not batch_images:
                 continue
             
             try:
-                # Обрабатываем батч изображений
-                batch_embeddings = self.model.encode(
-                    batch_images,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True,
-                    show_progress_bar=False
+                batch_embeddings, encode_batch_size = self._encode_batch_adaptive(
+                    batch_images, features_future, encode_batch_size
                 )
-                
-                embeddings.append(batch_embeddings)
-                processed_count += len(valid_batch_paths)
-                
-                # Принудительная очистка памяти после каждого батча
-                del batch_images
-                del batch_embeddings
-                import gc
-                gc.collect()
-                
-                if progress_callback:
-                    current_batch = (batch_idx // batch_size) + 1
-                    progress_callback(
-                        current_batch, 
-                        total_batches, 
-                        f"Обработка батча {current_batch}/{total_batches} на {self.device.upper()} ({processed_count}/{len(image_paths)})"
-                    )
-                    
             except Exception as e:
-                logger.error(f"Ошибка при создании эмбеддингов для батча {batch_idx}: {e}")
-                # Принудительная очистка памяти при ошибке
-                if 'batch_images' in locals():
-                    del batch_images
-                import gc
-                gc.collect()
-                
-                # При ошибке памяти пытаемся уменьшить размер батча
-                if "allocate" in str(e).lower() or "memory" in str(e).lower():
-                    logger.warning(f"Ошибка памяти в батче {batch_idx}, попытка уменьшить размер батча")
-                    
-                    # Рекурсивно обрабатываем оставшуеся изображения с меньшим батчем
-                    if batch_size > 4:
-                        remaining_paths = image_paths[batch_idx:]
-                        if remaining_paths:
-                            # Создаем новый экземпляр анализатора с меньшим батчем
-                            smaller_batch_embeddings = self._encode_images_smaller_batch(
-                                remaining_paths, 
-                                max(4, batch_size // 2),
-                                progress_callback,
-                                current_batch=batch_idx // batch_size,
-                                total_batches=total_batches
-                            )
-                            if len(smaller_batch_embeddings) > 0:
-                                embeddings.append(smaller_batch_embeddings)
-                        break
+                logger.error(f"Ошибка при создании эмбеддингов для батча {batch_number}: {e}")
                 continue
-        
-        if embeddings:
-            try:
-                result = np.vstack(embeddings)
-                logger.info(f"Успешно создано {len(result)} эмбеддингов")
-                return result
-            except Exception as e:
-                logger.error(f"Ошибка при объединении эмбеддингов: {e}")
-                return np.array([])
-        else:
-            logger.warning("Не удалось создать ни одного эмбеддинга")
-            return np.array([])
+            
+            yield batch_number, batch_embeddings
     
-    def _encode_images_smaller_batch(self, image_paths: List[str], small_batch_size: int, 
-                                   progress_callback: Optional[callable] = None,
-                                   current_batch: int = 0, total_batches: int = 1) -> np.ndarray:
-        """
-        Вспомогательный метод для обработки изображений с уменьшенным размером батча.
+    def _iter_image_batches(self, image_paths: List[str], batch_size: int) -> Iterator[List[Image.Image]]:
         """
-        embeddings = []
+        Параллельная загрузка изображений в пуле потоков с опережением на IMAGE_PREFETCH_BATCHES батчей.
+        Незагрузившиеся изображения в батч не попадают.
         
-        for batch_idx in range(0, len(image_paths), small_batch_size):
-            batch_paths = image_paths[batch_idx:batch_idx + small_batch_size]
-            batch_images = []
+        Args:
+            image_paths: Список путей к изображениям
+            batch_size: Размер батча
             
-            for path in batch_paths:
-                try:
-                    image = self._load_and_preprocess_image(path)
-                    batch_images.append(image)
-                except Exception as e:
-                    logger.warning(f"Не удалось загрузить изображение {path}: {e}")
-                    continue
+        Yields:
+            List[PIL.Image.Image]: Загруженные изображения очередного батча
+        """
+        batch_starts = iter(range(0, len(image_paths), batch_size))
+        
+        def submit(start: int) -> list:
+            return [
+                self._io_pool.submit(self._try_load_image, path)
+                for path in image_paths[start:start + batch_size]
+            ]
+        
+        # range стоит первым, чтобы zip не забирал лишний элемент из batch_starts
+        pending = deque(submit(start) for _, start in zip(range(IMAGE_PREFETCH_BATCHES), batch_starts))
+        while pending:
+            futures = pending.popleft()
+            next_start = next(batch_starts, None)
+            if next_start is not None:
+                pending.append(submit(next_start))
             
-            if not batch_images:
-                continue
+            images = (future.result() for future in futures)
+            yield [image for image in images if image is not None]
+    
+    def _encode_batch_adaptive(self, batch_images: List[Image.Image], features_future,
+                               batch_size: int) -> Tuple[torch.Tensor, int]:
+        """
+        Кодирование батча с уменьшением размера вдвое при нехватке памяти (CUDA OOM или RAM).
+        
+        Args:
+            batch_images: Изображения батча
+            features_future: Future с подготовленными данными всего батча
+            batch_size: Текущий размер батча для кодирования
             
+        Returns:
+            Tuple[torch.Tensor, int]: Эмбеддинги батча на устройстве и размер батча для следующих вызовов
+        """
+        while True:
             try:
-                batch_embeddings = self.model.encode(
-                    batch_images,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True,
-                    show_progress_bar=False
-                )
+                if features_future is not None and len(batch_images) <= batch_size:
+                    return self._encode_features(features_future.result()), batch_size
                 
-                embeddings.append(batch_embeddings)
+                # После уменьшения размера батч кодируется частями
+                parts = [
+                    self._encode(batch_images[start:start + batch_size])
+                    for start in range(0, len(batch_images), batch_size)
+                ]
+                return torch.cat(parts), batch_size
                 
-                # Очистка памяти
-                del batch_images
-                del batch_embeddings
-                import gc
-                gc.collect()
+            except RuntimeError as e:
+                message = str(e).lower()
+                if ("memory" not in message and "allocate" not in message) or batch_size <= 1:
+                    raise
                 
-                if progress_callback:
-                    current_batch += 1
-                    progress_callback(
-                        current_batch, 
-                        total_batches, 
-                        f"Восстановление: батч {current_batch}/{total_batches} (размер: {small_batch_size})"
-                    )
-                    
-            except Exception as e:
-                logger.error(f"Ошибка в уменьшенном батче {batch_idx}: {e}")
-                if 'batch_images' in locals():
-                    del batch_images
-                import gc
-                gc.collect()
-                continue
-        
-        if embeddings:
-            return np.vstack(embeddings)
-        else:
-            return np.array([])
+                features_future = None
+                if self.device == 'cuda':
+                    torch.cuda.empty_cache()
+                batch_size = max(1, min(batch_size, len(batch_images)) // 2)
+                logger.warning(f"Недостаточно памяти, размер батча уменьшен до {batch_size}")
     
     def encode_text(self, text: str) -> np.ndarray:
         """
@@ -272,22 +474,52 @@ class ImageAnalyzer:
         Returns:
             numpy.ndarray: Эмбеддинг текста
         """
+        return self.encode_texts([text])[0]
+    
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Создание эмбеддингов для нескольких текстовых запросов батчами.
+        Для нескольких запросов предпочтительнее одного вызова encode_text на каждый.
+        
+        Args:
+            texts: Список текстовых запросов
+            
+        Returns:
+            numpy.ndarray: Массив эмбеддингов (len(texts), D)
+        """
         if not self.model:
             raise RuntimeError("Модель не инициализирована")
         
         try:
-            embedding = self.model.encode(
-                [text],
-                convert_to_numpy=True,
-                normalize_embeddings=True
-            )
-            return embedding[0]
+            batches = [
+                self._encode(texts[start:start + TEXT_BATCH_SIZE])
+                for start in range(0, len(texts), TEXT_BATCH_SIZE)
+            ]
+            return torch.cat(batches).cpu().numpy() if batches else np.array([])
             
         except Exception as e:
-            logger.error(f"Ошибка при создании эмбеддинга для текста '{text}': {e}")
+            logger.error(f"Ошибка при создании эмбеддингов для текстов {texts[:3]}: {e}")
             raise
     
-    def _load_and_preprocess_image(self, image_path: str) -> Image.Image:
+    @staticmethod
+    def _try_load_image(image_path: str) -> Optional[Image.Image]:
+        """
+        Загрузка изображения для батча; ошибка записывается в лог вместо исключения.
+        
+        Args:
+            image_path: Путь к изображению
+            
+        Returns:
+            Optional[PIL.Image.Image]: Изображение или None при ошибке загрузки
+        """
+        try:
+            return ImageAnalyzer._load_and_preprocess_image(image_path)
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить изображение {image_path}: {e}")
+            return None
+    
+    @staticmethod
+    def _load_and_preprocess_image(image_path: str) -> Image.Image:
         """
         Загрузка и предобработка изображения с оптимизацией памяти.
         
@@ -298,34 +530,70 @@ class ImageAnalyzer:
             PIL.Image.Image: Предобработанное изображение
         """
         try:
+            if turbojpeg is not None and image_path.lower().endswith(('.jpg', '.jpeg')):
+                image = ImageAnalyzer._decode_jpeg(image_path)
+                if image is not None:
+                    return image
+            
             image = Image.open(image_path)
             
+            # Окончательный resize выполняет процессор CLIP. Для JPEG декодирование сразу идет
+            # в уменьшенном масштабе (DCT-scaling в libjpeg), для остальных форматов draft ничего не делает
+            draft_size = CLIP_IMAGE_SIZE * 2
+            image.draft('RGB', (draft_size, draft_size))
+            
             # Конвертация в RGB если необходимо
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            # Ограничиваем размер изображения для экономии памяти
-            # CLIP модели работают эффективно с изображениями до 1024x1024
-            max_size = 1024
+            # Очень большие изображения других форматов уменьшаем дешевым целочисленным reduce,
+            # оставляя запас разрешения для процессора CLIP
             width, height = image.size
+            factor = min(width, height) // draft_size
+            if factor > 1:
+                image = image.reduce(factor)
+                logger.debug(f"Изображение {image_path} уменьшено с {width}x{height} в {factor} раз")
             
-            if width > max_size or height > max_size:
-                # Сохраняем пропорции при изменении размера
-                if width > height:
-                    new_width = max_size
-                    new_height = int((height * max_size) / width)
-                else:
-                    new_height = max_size
-                    new_width = int((width * max_size) / height)
-                
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                logger.debug(f"Изображение {image_path} изменено с {width}x{height} на {new_width}x{new_height}")
-            
+            # PIL декодирует пиксели лениво: декодирование (и ошибки поврежденных файлов)
+            # должно произойти здесь, в потоке загрузки, а не при подготовке батча
+            image.load()
             return image
             
         except Exception as e:
             raise IOError(f"Не удалось загрузить изображение {image_path}: {e}")
     
+    @staticmethod
+    def _decode_jpeg(image_path: str) -> Optional[Image.Image]:
+        """
+        Декодирование JPEG через libjpeg-turbo сразу в RGB с DCT-масштабированием
+        до размера не меньше CLIP_IMAGE_SIZE * 2 по короткой стороне.
+        
+        Args:
+            image_path: Путь к JPEG файлу
+            
+        Returns:
+            Optional[PIL.Image.Image]: Изображение или None, если turbojpeg не смог его декодировать
+        """
+        try:
+            jpeg_decoder = getattr(_jpeg_local, 'decoder', None)
+            if jpeg_decoder is None:
+                jpeg_decoder = _jpeg_local.decoder = turbojpeg.TurboJPEG()
+            
+            with open(image_path, 'rb') as f:
+                data = f.read()
+            
+            width, height, _, _ = jpeg_decoder.decode_header(data)
+            draft_size = CLIP_IMAGE_SIZE * 2
+            scale = next((k for k in (8, 4, 2) if min(width, height) // k >= draft_size), 1)
+            
+            pixels = jpeg_decoder.decode(data, pixel_format=turbojpeg.TJPF_RGB,
+                                          scaling_factor=(1, scale))
+            # Процессор CLIP принимает PIL-изображения, копия буфера при этом не создается
+            return Image.fromarray(pixels, 'RGB')
+        except Exception as e:
+            logger.debug(f"turbojpeg не смог декодировать {image_path}, используется Pillow: {e}")
+            return None
+    
     def calculate_similarity(self, text_embedding: np.ndarray, 
                            image_embeddings: np.ndarray) -> np.ndarray:
         """
@@ -341,9 +609,10 @@ class ImageAnalyzer:
         if len(image_embeddings) == 0:
             return np.array([])
         
-        # Вычисление косинусного сходства
-        similarities = np.dot(image_embeddings, text_embedding)
-        return similarities
+        # Вычисление косинусного сходства (эмбеддинги нормализованы): один вызов BLAS gemv в float32
+        image_embeddings = np.asarray(image_embeddings, dtype=np.float32)
+        text_embedding = np.asarray(text_embedding, dtype=np.float32)
+        return image_embeddings @ text_embedding
     
     def is_model_ready(self) -> bool:
         """
@@ -5,22 +5,16 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import threading
+import queue
+import time
 import logging
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
 from pathlib import Path
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('image_search.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
-from search_engine import SearchEngine
 from gui_components import ProgressDialog, ResultsPanel, SearchOptionsFrame
 from config import (
     APP_NAME, APP_VERSION, WINDOW_WIDTH, WINDOW_HEIGHT, 
@@ -29,19 +23,111 @@ from config import (
 
 logger = logging.getLogger(__name__)
 
+# Период опроса очереди событий рабочих потоков (мс) и максимум событий за один опрос
+UI_QUEUE_POLL_MS = 50
+UI_QUEUE_MAX_EVENTS = 100
+
+# Прогресс построения индекса передается не чаще раза в PROGRESS_MIN_INTERVAL секунд
+# (или каждый PROGRESS_EVERY_CALLS вызов), финальное значение передается всегда
+PROGRESS_MIN_INTERVAL = 0.1
+PROGRESS_EVERY_CALLS = 64
+
+# Задержка поиска по Enter (мс): быстрые повторные нажатия схлопываются в один поиск
+SEARCH_DEBOUNCE_MS = 200
+# Количество последних результатов поиска, хранимых для повторных запросов
+SEARCH_CACHE_SIZE = 32
+
+@lru_cache(maxsize=4096)
+def _folder_name(folder_path: str) -> str:
+    """Имя папки для отображения (кэшируется, чтобы не создавать Path на каждое обновление)."""
+    return Path(folder_path).name
+
+class _EngineExecutor:
+    """
+    Последовательное выполнение задач движка в одном daemon-потоке.
+    В отличие от ThreadPoolExecutor, выполняющаяся задача (загрузка модели, построение индекса)
+    не задерживает завершение процесса после закрытия окна.
+    """
+    
+    def __init__(self, name: str):
+        """
+        Инициализация и запуск рабочего потока.
+        
+        Args:
+            name: Имя рабочего потока
+        """
+        self._jobs = queue.Queue()
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+    
+    def submit(self, fn, *args) -> Future:
+        """
+        Постановка задачи в очередь.
+        
+        Returns:
+            Future: Результат задачи (задачу, которая еще не начата, можно отменить)
+        """
+        future = Future()
+        self._jobs.put((future, fn, args))
+        return future
+    
+    def shutdown(self):
+        """Отмена ожидающих задач и остановка потока после текущей задачи."""
+        try:
+            while True:
+                job = self._jobs.get_nowait()
+                if job is not None:
+                    job[0].cancel()
+        except queue.Empty:
+            pass
+        self._jobs.put(None)
+    
+    def _run(self):
+        """Цикл рабочего потока."""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            
+            future, fn, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
 class ImageSearchApp:
     """Главный класс приложения для поиска изображений."""
     
     def __init__(self):
         """Инициализация приложения."""
         self.root = tk.Tk()
-        self.search_engine = SearchEngine()
+        # Поисковый движок (torch и модель CLIP) загружается в фоне после отрисовки окна
+        self.search_engine = None
+        self._engine_error = None  # Текст ошибки, если движок загрузить не удалось
         self.current_directories = []  # Изменено на список папок
+        self._dir_set = frozenset()    # Те же папки для проверки принадлежности за O(1)
         self.recursive_search = True   # Настройка рекурсивного поиска
+        # Статистика индекса, вычисленная для версии индекса _stats_version
+        self._stats_cache = None
+        self._stats_version = -1
+        # Отложенные изменения виджетов, применяемые одним проходом в after_idle
+        self._ui_dirty = False
+        self._pending_ui = {}
+        self._applied_ui = {}  # последние примененные значения, повторная установка пропускается
+        # События из рабочих потоков, обрабатываемые в главном потоке периодическим опросом
+        self._ui_queue = queue.Queue()
+        # Один фоновый daemon-поток для задач движка: построение индекса и поиск выполняются по очереди
+        self._executor = _EngineExecutor('engine')
+        self._search_future = None
+        # Результаты последних поисков по ключу (запрос, число результатов, версия индекса)
+        self._search_cache = OrderedDict()
+        self._search_after_id = None
         
         self._setup_ui()
         self._setup_bindings()
-        self._load_last_folders()  # Загрузка последних выбранных папок
+        self.root.after(UI_QUEUE_POLL_MS, self._drain_ui_queue)
+        self._init_engine()
         
         logger.info(f"Приложение {APP_NAME} v{APP_VERSION} запущено")
     
@@ -49,12 +135,10 @@ class ImageSearchApp:
         """Настройка пользовательского интерфейса."""
         # Настройка главного окна
         self.root.title(f"{APP_NAME} v{APP_VERSION}")
-        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.root.minsize(WINDOW_MIN_WIDTH, WINDOW_MIN_HEIGHT)
         self.root.configure(bg=COLORS['bg_primary'])
         
-        # Центрирование окна на экране
-        self.root.update_idletasks()
+        # Размер и положение по центру экрана задаются одним вызовом (размеры экрана не требуют раскладки)
         x = (self.root.winfo_screenwidth() // 2) - (WINDOW_WIDTH // 2)
         y = (self.root.winfo_screenheight() // 2) - (WINDOW_HEIGHT // 2)
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}+{x}+{y}")
@@ -67,6 +151,19 @@ class ImageSearchApp:
         self._create_results_panel()
         self._create_status_bar()
         
+        # Диалог прогресса создается один раз и показывается на время построения индекса
+        self._progress_dialog = ProgressDialog(self.root, "Построение индекса", hidden=True)
+        
+        # Переменные и виджеты, изменяемые через _queue_ui
+        self._ui_targets = {
+            'status': self.status_var,
+            'index_status': self.index_status_var,
+            'directories': self.directories_var,
+            'build_index_button': self.build_index_button,
+            'search_button': self.search_button,
+            'query_entry': self.query_entry,
+        }
+        
         # Начальное состояние
         self._update_ui_state()
     
@@ -82,7 +179,7 @@ class ImageSearchApp:
         file_menu.add_separator()
         file_menu.add_command(label="Очистить кэш", command=self._clear_cache)
         file_menu.add_separator()
-        file_menu.add_command(label="Выход", command=self.root.quit)
+        file_menu.add_command(label="Выход", command=self._on_close)
         
         # Меню "Вид"
         view_menu = tk.Menu(menubar, tearoff=0)
@@ -207,42 +304,227 @@ class ImageSearchApp:
     def _setup_bindings(self):
         """Настройка привязок клавиш."""
         # Enter в поле поиска запускает поиск
-        self.query_entry.bind('<Return>', lambda e: self._perform_search())
+        self.query_entry.bind('<Return>', lambda e: self._schedule_search())
         
         # Горячие клавиши
         self.root.bind('<Control-o>', lambda e: self._select_directories())
         self.root.bind('<Control-f>', lambda e: self.query_entry.focus_set())
         self.root.bind('<F5>', lambda e: self._rebuild_index())
+        
+        # Закрытие окна
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+    
+    def _queue_ui(self, key: str, value: str) -> None:
+        """
+        Отложенное изменение текста переменной или состояния виджета.
+        Все изменения до ближайшего простоя цикла Tk применяются одним проходом.
+        
+        Args:
+            key: Ключ из self._ui_targets
+            value: Текст для StringVar или состояние виджета ('normal'/'disabled')
+        """
+        self._pending_ui[key] = value
+        if not self._ui_dirty:
+            self._ui_dirty = True
+            self.root.after_idle(self._flush_ui)
+    
+    def _flush_ui(self) -> None:
+        """Применение накопленных изменений интерфейса."""
+        pending, self._pending_ui = self._pending_ui, {}
+        self._ui_dirty = False
+        
+        applied = self._applied_ui
+        for key, value in pending.items():
+            if applied.get(key) == value:
+                continue
+            applied[key] = value
+            
+            target = self._ui_targets[key]
+            if isinstance(target, tk.Variable):
+                target.set(value)
+            else:
+                target.config(state=value)
+    
+    def _post_ui(self, callback, *args) -> None:
+        """
+        Передача вызова из рабочего потока в главный поток через очередь событий.
+        
+        Args:
+            callback: Функция, вызываемая в главном потоке
+            *args: Аргументы вызова
+        """
+        self._ui_queue.put(('call', callback, args))
+    
+    def _post_progress(self, progress_dialog: ProgressDialog, job: int,
+                       current: int, total: int, message: str) -> None:
+        """
+        Передача обновления прогресса из рабочего потока в главный поток.
+        
+        Args:
+            progress_dialog: Диалог прогресса
+            job: Номер операции диалога
+            current: Текущее значение
+            total: Максимальное значение
+            message: Сообщение о состоянии
+        """
+        self._ui_queue.put(('progress', (progress_dialog, job), (current, total, message)))
+    
+    def _make_progress_callback(self, progress_dialog: ProgressDialog, job: int):
+        """
+        Создание прореженного обратного вызова прогресса для рабочего потока.
+        
+        Args:
+            progress_dialog: Диалог прогресса
+            job: Номер операции диалога из reset()
+            
+        Returns:
+            callable: Функция (current, total, message)
+        """
+        last_time = 0.0
+        calls = 0
+        # Вызывается на каждый обработанный файл: атрибуты привязываются к локальным именам один раз
+        monotonic = time.monotonic
+        is_cancelled = progress_dialog.is_cancelled
+        post_progress = self._post_progress
+        
+        def progress_callback(current, total, message):
+            nonlocal last_time, calls
+            calls += 1
+            now = monotonic()
+            if calls % PROGRESS_EVERY_CALLS and now - last_time < PROGRESS_MIN_INTERVAL and current != total:
+                return
+            
+            last_time = now
+            if not is_cancelled(job):
+                post_progress(progress_dialog, job, current, total, message)
+        
+        return progress_callback
+    
+    def _drain_ui_queue(self) -> None:
+        """
+        Обработка накопившихся событий рабочих потоков (не более UI_QUEUE_MAX_EVENTS за опрос).
+        Из нескольких подряд идущих обновлений прогресса диалога применяется только последнее.
+        """
+        pending_progress = {}
+        
+        def apply_progress():
+            for (progress_dialog, job), args in pending_progress.items():
+                progress_dialog.update_progress(*args, job=job)
+            pending_progress.clear()
+        
+        try:
+            for _ in range(UI_QUEUE_MAX_EVENTS):
+                kind, target, args = self._ui_queue.get_nowait()
+                if kind == 'progress':
+                    pending_progress[target] = args
+                else:
+                    # Прогресс применяется до вызова, чтобы не обновлять уже закрытый диалог
+                    apply_progress()
+                    target(*args)
+        except queue.Empty:
+            pass
+        finally:
+            apply_progress()
+            self.root.after(UI_QUEUE_POLL_MS, self._drain_ui_queue)
+    
+    def _init_engine(self):
+        """Запуск загрузки поискового движка в фоновом потоке."""
+        self._queue_ui('status', "Загрузка модели CLIP...")
+        
+        def load_worker():
+            try:
+                from search_engine import SearchEngine
+                engine = SearchEngine()
+            except Exception as e:
+                logger.error(f"Не удалось загрузить поисковый движок: {e}")
+                self._post_ui(self._on_engine_error, str(e))
+                return
+            
+            self._post_ui(self._on_engine_ready, engine)
+        
+        self._executor.submit(load_worker)
+    
+    def _on_engine_ready(self, engine):
+        """Обработка завершения загрузки движка."""
+        self.search_engine = engine
+        self._queue_ui('status', "Готов к работе. Выберите папку с изображениями.")
+        self._load_last_folders()  # Загрузка последних выбранных папок
+        self._update_ui_state()
+    
+    def _on_engine_error(self, error_msg: str):
+        """Обработка ошибки загрузки движка."""
+        self._engine_error = error_msg
+        self._queue_ui('status', "Ошибка загрузки модели")
+        messagebox.showerror("Ошибка запуска", f"Не удалось загрузить поисковый движок:\n{error_msg}")
+    
+    def _require_engine(self) -> bool:
+        """
+        Проверка, что поисковый движок уже загружен.
+        
+        Returns:
+            bool: True если движок готов к использованию
+        """
+        if self.search_engine is None:
+            if self._engine_error is not None:
+                messagebox.showerror("Ошибка", f"Поисковый движок не загружен:\n{self._engine_error}")
+            else:
+                messagebox.showinfo("Подождите", "Модель еще загружается")
+            return False
+        return True
+    
+    def _get_index_stats(self) -> dict:
+        """
+        Статистика индекса по папкам, пересчитываемая только при изменении индекса.
+        
+        Returns:
+            dict: Результат get_index_stats_multiple_folders
+        """
+        version = self.search_engine.index_version
+        if self._stats_cache is None or self._stats_version != version:
+            self._stats_cache = self.search_engine.get_index_stats_multiple_folders()
+            self._stats_version = version
+        return self._stats_cache
     
     def _update_ui_state(self):
         """Обновление состояния элементов интерфейса."""
-        has_directories = bool(self.current_directories)
-        index_ready = self.search_engine.is_ready()
+        engine_loaded = self.search_engine is not None
+        has_directories = bool(self.current_directories) and engine_loaded
+        index_ready = engine_loaded and self.search_engine.is_ready()
         
-        # Состояние кнопок
-        self.build_index_button.config(state='normal' if has_directories else 'disabled')
-        self.search_button.config(state='normal' if index_ready else 'disabled')
-        self.query_entry.config(state='normal' if index_ready else 'disabled')
+        # Состояние кнопок (неизменившиеся состояния _flush_ui не применяет)
+        build_state = 'normal' if has_directories else 'disabled'
+        search_state = 'normal' if index_ready else 'disabled'
+        self._queue_ui('build_index_button', build_state)
+        self._queue_ui('search_button', search_state)
+        self._queue_ui('query_entry', search_state)
         
         # Статус индекса
         if index_ready:
-            stats = self.search_engine.get_index_stats_multiple_folders()
+            stats = self._get_index_stats()
             total_images = stats.get('total_images', 0)
             total_folders = stats.get('total_folders', 0)
-            self.index_status_var.set(f"Индекс: {total_images} изображений из {total_folders} папок")
+            self._queue_ui('index_status', f"Индекс: {total_images} изображений из {total_folders} папок")
         else:
-            self.index_status_var.set("Индекс не построен")
+            self._queue_ui('index_status', "Индекс не построен")
     
     def _select_directories(self):
         """Выбор папок для поиска изображений."""
         from gui_components import MultipleFolderSelector
         
+        if not self._require_engine():
+            return
+        
         # Создаем диалог выбора папок
         selector = MultipleFolderSelector(self.root, self.current_directories)
         confirmed, selected_folders, recursive = selector.show_modal()
         
         if confirmed and selected_folders:
-            self.current_directories = selected_folders
+            # Тот же набор папок с той же настройкой: построенный индекс остается актуальным
+            if frozenset(selected_folders) == self._dir_set and recursive == self.recursive_search:
+                logger.info("Набор папок не изменился, индекс сохранен")
+                return
+            
+            self._set_directories(selected_folders)
             self.recursive_search = recursive
             
             # Обновляем отображение выбранных папок
@@ -260,29 +542,39 @@ class ImageSearchApp:
             self._update_ui_state()
             logger.info(f"Выбрано {len(selected_folders)} папок для индексации")
     
+    def _set_directories(self, folders: list) -> None:
+        """
+        Установка списка выбранных папок (без повторов, с сохранением порядка).
+        
+        Args:
+            folders: Список путей к папкам
+        """
+        self.current_directories = list(dict.fromkeys(folders))
+        self._dir_set = frozenset(self.current_directories)
+    
     def _update_directories_display(self):
         """Обновление отображения выбранных папок."""
         if not self.current_directories:
-            self.directories_var.set("Папки не выбраны")
-            self.status_var.set("Готов к работе")
+            self._queue_ui('directories', "Папки не выбраны")
+            self._queue_ui('status', "Готов к работе")
         elif len(self.current_directories) == 1:
-            self.directories_var.set(self.current_directories[0])
-            self.status_var.set(f"Выбрана папка: {self.current_directories[0]}")
+            self._queue_ui('directories', self.current_directories[0])
+            self._queue_ui('status', f"Выбрана папка: {self.current_directories[0]}")
         else:
-            folder_names = [Path(folder).name for folder in self.current_directories]
-            display_text = f"{len(self.current_directories)} папок: {', '.join(folder_names[:3])}"
+            folder_names = [_folder_name(folder) for folder in self.current_directories[:3]]
+            display_text = f"{len(self.current_directories)} папок: {', '.join(folder_names)}"
             if len(self.current_directories) > 3:
                 display_text += f" и еще {len(self.current_directories) - 3}..."
             
-            self.directories_var.set(display_text)
-            self.status_var.set(f"Выбрано {len(self.current_directories)} папок для индексации")
+            self._queue_ui('directories', display_text)
+            self._queue_ui('status', f"Выбрано {len(self.current_directories)} папок для индексации")
     
     def _load_last_folders(self):
         """Загрузка последних выбранных папок."""
         try:
             config = self.search_engine.cache_manager.load_multiple_folders_config()
             if config:
-                self.current_directories = config.get('folder_paths', [])
+                self._set_directories(config.get('folder_paths', []))
                 self.recursive_search = config.get('recursive', True)
                 self._update_directories_display()
                 self._update_ui_state()
@@ -292,13 +584,16 @@ class ImageSearchApp:
     
     def _select_directory(self):
         """Старый метод выбора одной папки (для совместимости)."""
+        if not self._require_engine():
+            return
+        
         directory = filedialog.askdirectory(
             title="Выберите папку с изображениями",
             initialdir=self.current_directories[0] if self.current_directories else str(Path.home())
         )
         
         if directory:
-            self.current_directories = [directory]
+            self._set_directories([directory])
             self.recursive_search = True
             self._update_directories_display()
             
@@ -311,20 +606,22 @@ class ImageSearchApp:
     
     def _build_index(self):
         """Построение индекса изображений."""
+        if not self._require_engine():
+            return
+        
         if not self.current_directories:
             messagebox.showwarning("Предупреждение", "Сначала выберите папки с изображениями")
             return
         
-        # Получение настроек
+        # Получение настроек (в главном потоке, до запуска рабочего потока)
         date_filter = self.options_frame.get_date_filter()
         
+        progress_dialog = self._progress_dialog
+        job = progress_dialog.reset("Построение индекса")
+        
         # Запуск построения индекса в отдельном потоке
         def build_worker():
-            progress_dialog = ProgressDialog(self.root, "Построение индекса")
-            
-            def progress_callback(current, total, message):
-                if not progress_dialog.is_cancelled():
-                    progress_dialog.update_progress(current, total, message)
+            progress_callback = self._make_progress_callback(progress_dialog, job)
             
             try:
                 success = self.search_engine.build_index_multiple_folders(
@@ -334,24 +631,29 @@ class ImageSearchApp:
                     progress_callback=progress_callback
                 )
                 
-                if success and not progress_dialog.is_cancelled():
-                    self.root.after(0, self._on_index_built_success)
-                elif progress_dialog.is_cancelled():
-                    self.root.after(0, self._on_index_cancelled)
+                if success and not progress_dialog.is_cancelled(job):
+                    outcome = (self._on_index_built_success,)
+                elif progress_dialog.is_cancelled(job):
+                    outcome = (self._on_index_cancelled,)
                 else:
-                    self.root.after(0, self._on_index_built_error)
+                    outcome = (self._on_index_built_error,)
                     
             except Exception as e:
                 logger.error(f"Ошибка при построении индекса: {e}")
-                self.root.after(0, lambda: self._on_index_built_error(str(e)))
+                outcome = (self._on_index_built_error, str(e))
             finally:
-                progress_dialog.close()
+                # Диалог закрывается до показа результата
+                self._post_ui(progress_dialog.hide, job)
+            
+            self._post_ui(*outcome)
         
-        thread = threading.Thread(target=build_worker, daemon=True)
-        thread.start()
+        self._executor.submit(build_worker)
     
     def _rebuild_index(self):
         """Принудительная перестройка индекса."""
+        if not self._require_engine():
+            return
+        
         if not self.current_directories:
             messagebox.showwarning("Предупреждение", "Сначала выберите папки с изображениями")
             return
@@ -362,16 +664,17 @@ class ImageSearchApp:
         )
         
         if result:
+            # Настройки читаются в главном потоке: переменные Tk нельзя трогать из рабочего потока
+            date_filter = self.options_frame.get_date_filter()
+            
+            progress_dialog = self._progress_dialog
+            job = progress_dialog.reset("Перестройка индекса")
+            
             # Запуск перестройки в отдельном потоке
             def rebuild_worker():
-                progress_dialog = ProgressDialog(self.root, "Перестройка индекса")
-                
-                def progress_callback(current, total, message):
-                    if not progress_dialog.is_cancelled():
-                        progress_dialog.update_progress(current, total, message)
+                progress_callback = self._make_progress_callback(progress_dialog, job)
                 
                 try:
-                    date_filter = self.options_frame.get_date_filter()
                     success = self.search_engine.build_index_multiple_folders(
                         self.current_directories,
                         recursive=self.recursive_search,
@@ -380,40 +683,41 @@ class ImageSearchApp:
                         force_rebuild=True
                     )
                     
-                    if success and not progress_dialog.is_cancelled():
-                        self.root.after(0, self._on_index_built_success)
-                    elif progress_dialog.is_cancelled():
-                        self.root.after(0, self._on_index_cancelled)
+                    if success and not progress_dialog.is_cancelled(job):
+                        outcome = (self._on_index_built_success,)
+                    elif progress_dialog.is_cancelled(job):
+                        outcome = (self._on_index_cancelled,)
                     else:
-                        self.root.after(0, self._on_index_built_error)
+                        outcome = (self._on_index_built_error,)
                         
                 except Exception as e:
                     logger.error(f"Ошибка при перестройке индекса: {e}")
-                    self.root.after(0, lambda: self._on_index_built_error(str(e)))
+                    outcome = (self._on_index_built_error, str(e))
                 finally:
-                    progress_dialog.close()
+                    # Диалог закрывается до показа результата
+                    self._post_ui(progress_dialog.hide, job)
+                
+                self._post_ui(*outcome)
             
-            thread = threading.Thread(target=rebuild_worker, daemon=True)
-            thread.start()
+            self._executor.submit(rebuild_worker)
     
     def _on_index_built_success(self):
         """Обработка успешного построения индекса."""
-        stats = self.search_engine.get_index_stats_multiple_folders()
+        stats = self._get_index_stats()
         total_images = stats.get('total_images', 0)
         total_folders = stats.get('total_folders', 0)
         
-        self.status_var.set(f"Индекс построен успешно. Проиндексировано: {total_images} изображений из {total_folders} папок")
+        self._queue_ui('status', f"Индекс построен успешно. Проиндексировано: {total_images} изображений из {total_folders} папок")
         self._update_ui_state()
         
         folder_info = ""
         if stats.get('folders'):
-            folder_details = []
-            for folder, count in stats['folders'].items():
-                folder_name = Path(folder).name
-                folder_details.append(f"• {folder_name}: {count} изображений")
-            folder_info = "\n\nПо папкам:\n" + "\n".join(folder_details[:5])
+            folder_details = ["\n\nПо папкам:"]
+            for folder, count in list(stats['folders'].items())[:5]:  # Показываем только первые 5
+                folder_details.append(f"• {_folder_name(folder)}: {count} изображений")
             if len(stats['folders']) > 5:
-                folder_info += f"\n... и еще {len(stats['folders']) - 5} папок"
+                folder_details.append(f"... и еще {len(stats['folders']) - 5} папок")
+            folder_info = "\n".join(folder_details)
         
         messagebox.showinfo(
             "Успех", 
@@ -424,65 +728,102 @@ class ImageSearchApp:
     
     def _on_index_built_error(self, error_msg: str = ""):
         """Обработка ошибки построения индекса."""
-        self.status_var.set("Ошибка при построении индекса")
+        self._queue_ui('status', "Ошибка при построении индекса")
         self._update_ui_state()
         messagebox.showerror("Ошибка", f"Не удалось построить индекс.\n{error_msg}")
     
     def _on_index_cancelled(self):
         """Обработка отмены построения индекса."""
-        self.status_var.set("Построение индекса отменено")
+        self._queue_ui('status', "Построение индекса отменено")
         self._update_ui_state()
     
+    def _schedule_search(self):
+        """Отложенный запуск поиска; повторный вызов до срабатывания переносит его."""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self._perform_search)
+    
     def _perform_search(self):
         """Выполнение поиска изображений."""
+        # Немедленный поиск (кнопка) снимает отложенный по Enter, чтобы запрос не выполнялся дважды
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
         query = self.query_var.get().strip()
         
         if not query:
             messagebox.showwarning("Предупреждение", "Введите описание для поиска")
             return
         
-        if not self.search_engine.is_ready():
+        if self.search_engine is None or not self.search_engine.is_ready():
             messagebox.showwarning("Предупреждение", "Сначала постройте индекс изображений")
             return
         
         # Получение настроек поиска
         max_results = self.options_frame.get_max_results()
         
+        # Повторный запрос к тому же индексу отдается из кэша
+        cache_key = (query, max_results, self.search_engine.index_version)
+        cached_results = self._search_cache.get(cache_key)
+        if cached_results is not None:
+            self._search_cache.move_to_end(cache_key)
+            self._on_search_completed(cached_results, query)
+            return
+        
         # Выполнение поиска в отдельном потоке
         def search_worker():
             try:
-                self.root.after(0, lambda: self.status_var.set(f"Поиск по запросу: '{query}'..."))
+                self._post_ui(self._queue_ui, 'status', f"Поиск по запросу: '{query}'...")
                 
                 results = self.search_engine.search(
                     query=query,
                     max_results=max_results
                 )
                 
-                self.root.after(0, lambda: self._on_search_completed(results, query))
+                self._post_ui(self._remember_search, cache_key, results)
+                self._post_ui(self._on_search_completed, results, query)
                 
             except Exception as e:
                 logger.error(f"Ошибка при поиске: {e}")
-                self.root.after(0, lambda: self._on_search_error(str(e)))
+                self._post_ui(self._on_search_error, str(e))
         
-        thread = threading.Thread(target=search_worker, daemon=True)
-        thread.start()
+        # Еще не начатый предыдущий поиск заменяется новым
+        if self._search_future is not None and not self._search_future.done():
+            self._search_future.cancel()
+        self._search_future = self._executor.submit(search_worker)
+    
+    def _remember_search(self, cache_key: tuple, results) -> None:
+        """
+        Сохранение результатов поиска в кэш последних запросов.
+        
+        Args:
+            cache_key: (запрос, число результатов, версия индекса)
+            results: Результаты поиска
+        """
+        self._search_cache[cache_key] = results
+        self._search_cache.move_to_end(cache_key)
+        while len(self._search_cache) > SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
     
     def _on_search_completed(self, results, query):
         """Обработка завершения поиска."""
         self.results_panel.show_results(results)
         
         if results:
-            self.status_var.set(f"Найдено {len(results)} результатов по запросу: '{query}'")
+            self._queue_ui('status', f"Найдено {len(results)} результатов по запросу: '{query}'")
         else:
-            self.status_var.set(f"По запросу '{query}' ничего не найдено")
+            self._queue_ui('status', f"По запросу '{query}' ничего не найдено")
     
     def _on_search_error(self, error_msg: str):
         """Обработка ошибки поиска."""
-        self.status_var.set("Ошибка при выполнении поиска")
+        self._queue_ui('status', "Ошибка при выполнении поиска")
         messagebox.showerror("Ошибка поиска", f"Не удалось выполнить поиск:\n{error_msg}")
     
     def _clear_cache(self):
         """Очистка кэша."""
+        if not self._require_engine():
+            return
+        
         result = messagebox.askyesno(
             "Подтверждение",
             "Очистить кэш? После этого потребуется заново построить индекс."
@@ -494,7 +835,7 @@ class ImageSearchApp:
                 self.search_engine.clear_index()
                 self.results_panel.show_no_results_message()
                 self._update_ui_state()
-                self.status_var.set("Кэш очищен")
+                self._queue_ui('status', "Кэш очищен")
                 messagebox.showinfo("Успех", "Кэш успешно очищен")
             except Exception as e:
                 logger.error(f"Ошибка при очистке кэша: {e}")
@@ -502,8 +843,11 @@ class ImageSearchApp:
     
     def _show_stats(self):
         """Отображение статистики."""
+        if not self._require_engine():
+            return
+        
         if hasattr(self.search_engine, 'get_index_stats_multiple_folders'):
-            stats = self.search_engine.get_index_stats_multiple_folders()
+            stats = self._get_index_stats()
             
             stats_text = f"""Статистика индекса:
 • Состояние: {'Построен' if stats['is_ready'] else 'Не построен'}
@@ -512,15 +856,17 @@ class ImageSearchApp:
 
 Статистика по папкам:"""
             
+            # Строки собираются в список и склеиваются один раз
+            parts = [stats_text]
             if stats.get('folders'):
                 for folder_path, count in list(stats['folders'].items())[:10]:  # Показываем только первые 10
-                    folder_name = Path(folder_path).name
-                    stats_text += f"\n• {folder_name}: {count} изображений"
+                    parts.append(f"• {_folder_name(folder_path)}: {count} изображений")
                 
                 if len(stats['folders']) > 10:
-                    stats_text += f"\n... и еще {len(stats['folders']) - 10} папок"
+                    parts.append(f"... и еще {len(stats['folders']) - 10} папок")
             else:
-                stats_text += "\n• Папки не выбраны"
+                parts.append("• Папки не выбраны")
+            stats_text = "\n".join(parts)
         else:
             # Fallback на старый метод
             stats = self.search_engine.get_index_stats()
@@ -549,6 +895,11 @@ class ImageSearchApp:
         
         messagebox.showinfo("О программе", about_text)
     
+    def _on_close(self):
+        """Закрытие приложения: отмена ожидающих задач движка и уничтожение окна."""
+        self._executor.shutdown()
+        self.root.destroy()
+    
     def run(self):
         """Запуск главного цикла приложения."""
         try:
@@ -563,6 +914,17 @@ class ImageSearchApp:
 
 def main():
     """Точка входа в приложение."""
+    # Настройка логирования (в main, а не при импорте: дочерний процесс миниатюр
+    # при запуске через spawn повторно импортирует этот модуль и не должен открывать лог-файл)
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('image_search.log', encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    
     try:
         app = ImageSearchApp()
         app.run()
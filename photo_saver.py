@@ -4,22 +4,270 @@
 """
 
 import os
+import sys
+import errno
 import shutil
+import struct
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 from PIL import Image
-from PIL.ExifTags import TAGS
+
+from config import PHOTO_SAVE_WORKERS
 
 logger = logging.getLogger(__name__)
 
+COPY_BUFFER_SIZE = 1024 * 1024  # Буфер копирования, если копирование в ядре недоступно
+
+# Прогресс сохранения передается не чаще раза в PROGRESS_MIN_INTERVAL секунд
+# (или каждый PROGRESS_EVERY_FILES файл), финальное значение передается всегда
+PROGRESS_MIN_INTERVAL = 0.1
+PROGRESS_EVERY_FILES = 16
+
+# Копирование без передачи данных через Python: (fd_in, fd_out, count, offset) -> скопировано байт
+_KERNEL_COPY_FUNCS = []
+if hasattr(os, 'copy_file_range'):
+    _KERNEL_COPY_FUNCS.append(lambda fd_in, fd_out, count, offset:
+                              os.copy_file_range(fd_in, fd_out, count, offset, offset))
+if hasattr(os, 'sendfile'):
+    _KERNEL_COPY_FUNCS.append(lambda fd_in, fd_out, count, offset:
+                              os.sendfile(fd_out, fd_in, offset, count))
+
+# Windows: нативное копирование CopyFile2 (Windows 8+), включая копирование на стороне сервера SMB
+_copy_file2 = None
+if sys.platform == 'win32':
+    try:
+        import ctypes
+        _copy_file2 = ctypes.windll.kernel32.CopyFile2
+        _copy_file2.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p)
+        _copy_file2.restype = ctypes.HRESULT  # Код ошибки HRESULT превращается в OSError
+    except (ImportError, AttributeError, OSError):
+        _copy_file2 = None
+
+# Клонирование (reflink) в пределах одной CoW-файловой системы: без копирования данных
+FICLONE = 0x40049409  # ioctl Linux (btrfs, XFS, bcachefs)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_clonefile = None  # clonefile(2) macOS (APFS)
+if sys.platform == 'darwin':
+    try:
+        import ctypes
+        _clonefile = ctypes.CDLL('libc.dylib', use_errno=True).clonefile
+        _clonefile.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32)
+        _clonefile.restype = ctypes.c_int
+    except (ImportError, AttributeError, OSError):
+        _clonefile = None
+
+# Ошибки, при которых способ копирования не поддерживается для этой пары файлов
+_KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                            errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+
+# Теги EXIF с датой в порядке приоритета: дата съемки, дата оцифровки, дата изменения
+_EXIF_DATE_TAG_IDS = (0x9003, 0x9004, 0x0132)
+_EXIF_IFD_POINTER = 0x8769  # Ссылка из IFD0 на подкаталог Exif (там DateTimeOriginal/Digitized)
+_EXIF_TYPE_ASCII = 2
+# Форматы, в которых обычно есть EXIF; для остальных (PNG и т.п.) дата берется из файловой системы
+_EXIF_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.tif', '.tiff', '.webp', '.heic', '.heif'})
+
+
+def _parse_exif_datetime(value: str) -> datetime:
+    """
+    Разбор даты EXIF фиксированного формата "YYYY:MM:DD HH:MM:SS" срезами (быстрее strptime).
+    
+    Raises:
+        ValueError: Если значение не является корректной датой
+    """
+    if len(value) < 19:
+        raise ValueError(f"некорректная дата EXIF: {value!r}")
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                    int(value[11:13]), int(value[14:16]), int(value[17:19]))
+
+
+def _month_folder_name(date: datetime) -> str:
+    """Имя подпапки ГГГГ-ММ для даты (без strftime)."""
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+def _read_jpeg_exif_dates(photo_path: str) -> Optional[Dict[int, str]]:
+    """
+    Чтение тегов даты напрямую из сегмента APP1 (Exif) JPEG, без разбора изображения в PIL.
+    
+    Args:
+        photo_path: Путь к изображению
+        
+    Returns:
+        Optional[Dict[int, str]]: {id тега: значение} для найденных тегов даты
+        или None, если файл не JPEG или заголовок не удалось разобрать
+    """
+    try:
+        with open(photo_path, 'rb') as f:
+            if f.read(2) != b'\xff\xd8':
+                return None
+            
+            while True:
+                header = f.read(4)
+                if len(header) < 4 or header[0] != 0xFF:
+                    return None
+                marker = header[1]
+                if marker in (0xDA, 0xD9):  # Начало данных изображения: APP1 уже не встретится
+                    return {}
+                length = struct.unpack('>H', header[2:])[0]
+                if marker == 0xE1:
+                    segment = f.read(length - 2)
+                    if segment[:6] == b'Exif\x00\x00':
+                        return _parse_tiff_dates(segment[6:])
+                else:
+                    f.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug(f"Не удалось разобрать заголовок JPEG {photo_path}: {e}")
+        return None
+
+
+def _parse_tiff_dates(tiff: bytes) -> Dict[int, str]:
+    """
+    Поиск тегов даты в TIFF-структуре EXIF: IFD0 и подкаталог Exif.
+    
+    Args:
+        tiff: Содержимое блока EXIF начиная с заголовка TIFF
+        
+    Returns:
+        Dict[int, str]: {id тега: значение} для найденных тегов даты
+    """
+    if tiff[:2] == b'II':
+        order = '<'
+    elif tiff[:2] == b'MM':
+        order = '>'
+    else:
+        raise ValueError("неизвестный порядок байт TIFF")
+    
+    found = {}
+    ifd_offset = struct.unpack_from(order + 'I', tiff, 4)[0]
+    exif_offset = _scan_ifd_dates(tiff, ifd_offset, order, found)
+    if exif_offset:
+        _scan_ifd_dates(tiff, exif_offset, order, found)
+    return found
+
+
+def _scan_ifd_dates(tiff: bytes, offset: int, order: str, found: Dict[int, str]) -> Optional[int]:
+    """
+    Просмотр записей одного IFD: теги даты добавляются в found.
+    
+    Returns:
+        Optional[int]: Смещение подкаталога Exif, если IFD на него ссылается
+    """
+    exif_offset = None
+    count = struct.unpack_from(order + 'H', tiff, offset)[0]
+    for entry in range(offset + 2, offset + 2 + count * 12, 12):
+        tag, value_type, value_count, value = struct.unpack_from(order + 'HHI4s', tiff, entry)
+        if tag == _EXIF_IFD_POINTER:
+            exif_offset = struct.unpack(order + 'I', value)[0]
+        elif tag in _EXIF_DATE_TAG_IDS and value_type == _EXIF_TYPE_ASCII:
+            if value_count > 4:
+                start = struct.unpack(order + 'I', value)[0]
+                value = tiff[start:start + value_count]
+            found[tag] = value[:value_count].split(b'\x00', 1)[0].decode('ascii', 'replace').strip()
+    return exif_offset
+
+
+def _reserve_path(path: str) -> bool:
+    """
+    Атомарное создание пустого файла, если такого еще нет.
+    
+    Returns:
+        bool: True если файл создан, False если путь уже занят
+    """
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _ficlone(fd_in: int, fd_out: int) -> bool:
+    """
+    Клонирование содержимого файла через ioctl FICLONE (Linux).
+    
+    Returns:
+        bool: True если файл склонирован, False если клонирование недоступно
+    """
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    if os.fstat(fd_in).st_dev != os.fstat(fd_out).st_dev:
+        return False
+    try:
+        fcntl.ioctl(fd_out, FICLONE, fd_in)
+        return True
+    except OSError:
+        return False
+
+
+def _clone_file(src: str, dst: str) -> bool:
+    """
+    Клонирование файла через clonefile (macOS). Клон создается рядом под временным
+    именем и атомарно заменяет зарезервированный целевой файл.
+    
+    Returns:
+        bool: True если файл склонирован, False если клонирование недоступно
+    """
+    if _clonefile is None:
+        return False
+    if os.stat(src).st_dev != os.stat(os.path.dirname(dst) or '.').st_dev:
+        return False
+    
+    temp_path = dst + '.clone~'
+    if _clonefile(os.fsencode(src), os.fsencode(temp_path), 0) != 0:
+        return False
+    os.replace(temp_path, dst)
+    return True
+
+
+def _kernel_copy(fd_in: int, fd_out: int, size: int) -> bool:
+    """
+    Копирование содержимого файла средствами ядра (copy_file_range, затем sendfile).
+    
+    Args:
+        fd_in: Дескриптор исходного файла
+        fd_out: Дескриптор целевого файла
+        size: Размер исходного файла
+        
+    Returns:
+        bool: True если файл скопирован, False если ни один способ не поддерживается
+    """
+    for copy in _KERNEL_COPY_FUNCS:
+        offset = 0
+        try:
+            while offset < size:
+                copied = copy(fd_in, fd_out, size - offset, offset)
+                if not copied:
+                    break
+                offset += copied
+            else:
+                return True
+        except OSError as e:
+            # Переход к другому способу возможен, только пока ничего не записано
+            if offset or e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+            continue
+        
+        # Способ вернул 0 байт: в начале файла - пробуем следующий, посередине - копия неполная
+        if offset:
+            raise OSError(errno.EIO, f"Копирование прервано на {offset} из {size} байт")
+    return False
+
+
 class PhotoSaver:
     """Класс для сохранения фотографий с автоматической организацией по датам."""
     
     def __init__(self):
         """Инициализация сохранялки фотографий."""
-        pass
+        # Даты фотографий по (путь, mtime_ns, размер): предпросмотр и сохранение не читают EXIF повторно
+        self._date_cache = {}
     
     def save_photos(self, photo_paths: List[str], destination_dir: str, 
                    progress_callback: Optional[callable] = None) -> Dict[str, any]:
@@ -37,11 +285,10 @@ class PhotoSaver:
         if not photo_paths:
             return {'success': False, 'error': 'Список фотографий пуст'}
         
-        if not os.path.exists(destination_dir):
-            try:
-                os.makedirs(destination_dir)
-            except Exception as e:
-                return {'success': False, 'error': f'Не удалось создать целевую директорию: {e}'}
+        try:
+            os.makedirs(destination_dir, exist_ok=True)
+        except Exception as e:
+            return {'success': False, 'error': f'Не удалось создать целевую директорию: {e}'}
         
         results = {
             'success': True,
@@ -54,42 +301,60 @@ class PhotoSaver:
         
         logger.info(f"Начинаем сохранение {len(photo_paths)} фотографий в {destination_dir}")
         
-        for i, photo_path in enumerate(photo_paths):
+        # Предварительный проход: целевые папки создаются до запуска потоков,
+        # чтобы потоки копирования не создавали одну и ту же папку одновременно
+        folders = {}
+        jobs = []
+        for photo_path, creation_date in zip(photo_paths, self._prefetch_dates(photo_paths)):
             try:
-                # Получаем дату создания фотографии
-                creation_date = self._get_photo_creation_date(photo_path)
+                if isinstance(creation_date, Exception):
+                    raise creation_date
+                # Подпапка в формате ГГГГ-ММ по дате создания фотографии
+                folder_name = _month_folder_name(creation_date)
+                target_folder = folders.get(folder_name)
+                if target_folder is None:
+                    target_folder = os.path.join(destination_dir, folder_name)
+                    try:
+                        os.makedirs(target_folder)
+                    except FileExistsError:
+                        pass
+                    else:
+                        results['created_folders'].add(folder_name)
+                        logger.info(f"Создана папка: {folder_name}")
+                    folders[folder_name] = target_folder
                 
-                # Создаем подпапку в формате ГГГГ-ММ
-                folder_name = creation_date.strftime('%Y-%m')
-                target_folder = os.path.join(destination_dir, folder_name)
-                
-                if not os.path.exists(target_folder):
-                    os.makedirs(target_folder)
-                    results['created_folders'].add(folder_name)
-                    logger.info(f"Создана папка: {folder_name}")
-                
-                # Определяем имя файла в целевой папке
+                # Имя файла вычисляется один раз: для пути назначения и для сообщений прогресса
                 original_name = os.path.basename(photo_path)
-                target_path = os.path.join(target_folder, original_name)
-                
-                # Если файл с таким именем уже существует, добавляем суффикс
-                target_path = self._get_unique_filename(target_path)
-                
-                # Копируем файл
-                shutil.copy2(photo_path, target_path)
-                results['saved_photos'] += 1
-                
-                logger.debug(f"Сохранено: {photo_path} -> {target_path}")
+                jobs.append((photo_path, original_name, os.path.join(target_folder, original_name)))
+            except Exception as e:
+                self._record_error(results, photo_path, e)
+        
+        # Копирование параллельно, статистика и прогресс обновляются в вызывающем потоке
+        total = len(photo_paths)
+        done = results['failed_photos']
+        last_emit = time.monotonic()
+        with ThreadPoolExecutor(max_workers=PHOTO_SAVE_WORKERS, thread_name_prefix='photo_saver') as executor:
+            futures = {executor.submit(self._copy_one, photo_path, target_path): (photo_path, original_name)
+                       for photo_path, original_name, target_path in jobs}
+            for future in as_completed(futures):
+                photo_path, original_name = futures[future]
+                done += 1
+                try:
+                    target_path = future.result()
+                except Exception as e:
+                    self._record_error(results, photo_path, e)
+                    message = f"Ошибка: {original_name}"
+                else:
+                    results['saved_photos'] += 1
+                    logger.debug(f"Сохранено: {photo_path} -> {target_path}")
+                    message = f"Сохранено: {original_name}"
                 
                 # Обновляем прогресс
                 if progress_callback:
-                    progress_callback(i + 1, len(photo_paths), f"Сохранено: {original_name}")
-                
-            except Exception as e:
-                error_msg = f"Ошибка при сохранении {photo_path}: {e}"
-                logger.error(error_msg)
-                results['errors'].append(error_msg)
-                results['failed_photos'] += 1
+                    now = time.monotonic()
+                    if done % PROGRESS_EVERY_FILES == 0 or now - last_emit >= PROGRESS_MIN_INTERVAL or done == total:
+                        last_emit = now
+                        progress_callback(done, total, message)
         
         # Финальная статистика
         results['created_folders'] = list(results['created_folders'])
@@ -98,6 +363,80 @@ class PhotoSaver:
         
         return results
     
+    def _copy_one(self, photo_path: str, target_path: str) -> str:
+        """
+        Копирование одной фотографии в целевую папку (выполняется в потоке пула).
+        
+        Args:
+            photo_path: Путь к фотографии
+            target_path: Желаемый путь копии в существующей целевой папке
+            
+        Returns:
+            str: Путь к сохраненной копии
+        """
+        # Если файл с таким именем уже существует, добавляем суффикс;
+        # имя резервируется пустым файлом, чтобы другой поток не выбрал его же
+        target_path = self._get_unique_filename(target_path)
+        
+        try:
+            self._fast_copy(photo_path, target_path)
+        except Exception:
+            # Не оставляем зарезервированный пустой или недописанный файл
+            try:
+                os.remove(target_path)
+            except OSError:
+                pass
+            raise
+        return target_path
+    
+    def _fast_copy(self, src: str, dst: str):
+        """
+        Копирование файла с сохранением метаданных (как shutil.copy2),
+        но без прохода данных через буферы Python, если ядро это поддерживает.
+        Порядок: CopyFile2 (Windows), клонирование (reflink), copy_file_range/sendfile, буферное копирование.
+        
+        Args:
+            src: Исходный файл
+            dst: Целевой файл (перезаписывается)
+        """
+        if _copy_file2 is not None:
+            # Целевой файл уже зарезервирован пустым - CopyFile2 его перезаписывает
+            _copy_file2(src, dst, None)
+        elif not _clone_file(src, dst):
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                # На одной CoW-файловой системе копия создается только метаданными
+                if not _ficlone(fsrc.fileno(), fdst.fileno()):
+                    size = os.fstat(fsrc.fileno()).st_size
+                    if not _kernel_copy(fsrc.fileno(), fdst.fileno(), size):
+                        shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+        shutil.copystat(src, dst)
+    
+    def _record_error(self, results: Dict[str, any], photo_path: str, error: Exception):
+        """Учет ошибки сохранения фотографии в статистике операции."""
+        error_msg = f"Ошибка при сохранении {photo_path}: {error}"
+        logger.error(error_msg)
+        results['errors'].append(error_msg)
+        results['failed_photos'] += 1
+    
+    def _prefetch_dates(self, photo_paths: List[str]) -> List[any]:
+        """
+        Параллельное получение дат создания фотографий (чтение заголовков перекрывается по файлам).
+        
+        Args:
+            photo_paths: Список путей к фотографиям
+            
+        Returns:
+            List[any]: Дата для каждого пути в том же порядке или исключение, возникшее при ее получении
+        """
+        def get_date(photo_path):
+            try:
+                return self._get_photo_creation_date(photo_path)
+            except Exception as e:
+                return e
+        
+        with ThreadPoolExecutor(max_workers=PHOTO_SAVE_WORKERS, thread_name_prefix='photo_dates') as executor:
+            return list(executor.map(get_date, photo_paths))
+    
     def _get_photo_creation_date(self, photo_path: str) -> datetime:
         """
         Получение даты создания фотографии из EXIF данных или файловой системы.
@@ -108,22 +447,30 @@ class PhotoSaver:
         Returns:
             datetime: Дата создания фотографии
         """
+        try:
+            stat = os.stat(photo_path)
+        except Exception as e:
+            logger.warning(f"Не удалось получить дату файла для {photo_path}: {e}")
+            # В крайнем случае используем текущую дату
+            return datetime.now()
+        
+        key = (photo_path, stat.st_mtime_ns, stat.st_size)
+        creation_date = self._date_cache.get(key)
+        if creation_date is not None:
+            return creation_date
+        
         try:
             # Сначала пытаемся получить дату из EXIF
-            exif_date = self._get_exif_date(photo_path)
-            if exif_date:
-                return exif_date
+            creation_date = self._get_exif_date(photo_path)
         except Exception as e:
             logger.debug(f"Не удалось получить EXIF дату для {photo_path}: {e}")
         
-        try:
+        if not creation_date:
             # Если EXIF недоступен, используем дату модификации файла
-            timestamp = os.path.getmtime(photo_path)
-            return datetime.fromtimestamp(timestamp)
-        except Exception as e:
-            logger.warning(f"Не удалось получить дату файла для {photo_path}: {e}")
-            # В крайнем случае используем текущую дату
-            return datetime.now()
+            creation_date = datetime.fromtimestamp(stat.st_mtime)
+        
+        self._date_cache[key] = creation_date
+        return creation_date
     
     def _get_exif_date(self, photo_path: str) -> Optional[datetime]:
         """
@@ -135,64 +482,86 @@ class PhotoSaver:
         Returns:
             Optional[datetime]: Дата создания из EXIF или None
         """
+        if os.path.splitext(photo_path)[1].lower() not in _EXIF_EXTENSIONS:
+            return None
+        
+        # JPEG: теги даты читаются прямо из сегмента APP1, остальные форматы разбирает PIL
+        exif_dates = _read_jpeg_exif_dates(photo_path)
+        if exif_dates is not None:
+            return self._pick_exif_date(exif_dates)
+        
         try:
             with Image.open(photo_path) as image:
                 exif_data = image._getexif()
-                
-                if exif_data is not None:
-                    # Ищем дату создания в различных EXIF тегах
-                    date_tags = [
-                        'DateTimeOriginal',  # Дата съемки
-                        'DateTime',          # Дата изменения
-                        'DateTimeDigitized'  # Дата оцифровки
-                    ]
-                    
-                    for tag_name in date_tags:
-                        for tag_id, value in exif_data.items():
-                            tag = TAGS.get(tag_id, tag_id)
-                            if tag == tag_name and value:
-                                # Парсим дату в формате EXIF: "YYYY:MM:DD HH:MM:SS"
-                                try:
-                                    return datetime.strptime(value, '%Y:%m:%d %H:%M:%S')
-                                except ValueError:
-                                    continue
             
-            return None
+            # _getexif возвращает словарь {id тега: значение}: теги даты берутся прямым поиском по id
+            return self._pick_exif_date(exif_data) if exif_data is not None else None
             
         except Exception as e:
             logger.debug(f"Ошибка при чтении EXIF из {photo_path}: {e}")
             return None
     
+    def _pick_exif_date(self, exif_data: Dict[int, any]) -> Optional[datetime]:
+        """
+        Выбор даты по приоритету тегов из словаря EXIF {id тега: значение}.
+        
+        Args:
+            exif_data: Теги EXIF
+            
+        Returns:
+            Optional[datetime]: Первая корректная дата по приоритету или None
+        """
+        for tag_id in _EXIF_DATE_TAG_IDS:
+            value = exif_data.get(tag_id)
+            if value:
+                # Парсим дату в формате EXIF: "YYYY:MM:DD HH:MM:SS"
+                try:
+                    return _parse_exif_datetime(value)
+                except (TypeError, ValueError):
+                    continue
+        return None
+    
     def _get_unique_filename(self, file_path: str) -> str:
         """
-        Получение уникального имени файла, добавляя суффикс если файл уже существует.
+        Получение и резервирование уникального имени файла, добавляя суффикс если файл уже существует.
+        Имя занимается атомарным созданием пустого файла (O_CREAT | O_EXCL),
+        поэтому параллельные сохранения не могут получить одно и то же имя.
         
         Args:
             file_path: Исходный путь к файлу
             
         Returns:
-            str: Уникальный путь к файлу
+            str: Уникальный путь к файлу (файл уже создан)
         """
-        if not os.path.exists(file_path):
+        if _reserve_path(file_path):
             return file_path
         
         directory = os.path.dirname(file_path)
-        filename = os.path.basename(file_path)
-        name, extension = os.path.splitext(filename)
+        name, extension = os.path.splitext(os.path.basename(file_path))
         
-        counter = 1
-        while True:
-            new_filename = f"{name}_({counter}){extension}"
-            new_path = os.path.join(directory, new_filename)
-            
-            if not os.path.exists(new_path):
+        def candidate(counter):
+            return os.path.join(directory, f"{name}_({counter}){extension}")
+        
+        # Первый свободный номер: удвоение до свободного, затем двоичный поиск между
+        # последним занятым и первым свободным - O(log n) проверок вместо n
+        occupied, free = 0, 1
+        while os.path.exists(candidate(free)):
+            occupied, free = free, free * 2
+        while free - occupied > 1:
+            middle = (occupied + free) // 2
+            if os.path.exists(candidate(middle)):
+                occupied = middle
+            else:
+                free = middle
+        
+        # Номер мог занять другой поток между проверкой и созданием - берем следующий
+        for counter in range(free, free + 1000):
+            new_path = candidate(counter)
+            if _reserve_path(new_path):
                 return new_path
-            
-            counter += 1
-            
-            # Защита от бесконечного цикла
-            if counter > 1000:
-                raise RuntimeError(f"Не удалось создать уникальное имя для файла {file_path}")
+        
+        # Защита от бесконечного цикла
+        raise RuntimeError(f"Не удалось создать уникальное имя для файла {file_path}")
     
     def preview_organization(self, photo_paths: List[str]) -> Dict[str, List[str]]:
         """
@@ -204,23 +573,21 @@ class PhotoSaver:
         Returns:
             Dict[str, List[str]]: Словарь {папка: [список_файлов]}
         """
-        organization = {}
-        
-        for photo_path in photo_paths:
-            try:
-                creation_date = self._get_photo_creation_date(photo_path)
-                folder_name = creation_date.strftime('%Y-%m')
-                
-                if folder_name not in organization:
-                    organization[folder_name] = []
-                
-                organization[folder_name].append(os.path.basename(photo_path))
-                
-            except Exception as e:
-                logger.warning(f"Не удалось обработать {photo_path}: {e}")
+        # Параллельные списки имен файлов и папок
+        names = [os.path.basename(photo_path) for photo_path in photo_paths]
+        folders = []
+        for photo_path, creation_date in zip(photo_paths, self._prefetch_dates(photo_paths)):
+            if isinstance(creation_date, Exception):
+                logger.warning(f"Не удалось обработать {photo_path}: {creation_date}")
                 # Добавляем в папку "unknown"
-                if 'unknown' not in organization:
-                    organization['unknown'] = []
-                organization['unknown'].append(os.path.basename(photo_path))
+                folders.append('unknown')
+                continue
+            
+            folders.append(_month_folder_name(creation_date))
+        
+        # Группировка одним проходом
+        organization = {}
+        for folder_name, name in zip(folders, names):
+            organization.setdefault(folder_name, []).append(name)
         
         return organization
@@ -58,6 +58,8 @@ class SearchEngine:
         self.current_embeddings: Dict[str, np.ndarray] = {}
         self.current_file_paths: List[str] = []
         self.is_index_built = False
+        # Номер версии индекса, увеличивается при каждом построении и очистке
+        self.index_version = 0
         
         # Блокировка для thread-safe операций
         self._lock = threading.Lock()
@@ -227,14 +229,19 @@ class SearchEngine:
                     start_chunk = resume_data.get('last_chunk', 0)
                     
                     # Исключаем уже обработанные файлы
-                    files_to_process = [f for f in uncached_paths if f not in processed_files]
+                    processed_set = set(processed_files)
+                    files_to_process = [f for f in uncached_paths if f not in processed_set]
                     logger.info(f"Восстановление с чанка {start_chunk}, осталось {len(files_to_process)} файлов")
                 
                 if not files_to_process:
                     logger.info("Все файлы уже обработаны")
                     self.is_index_built = True
+                    self.index_version += 1
                     return True
                 
+                # Резервируем место в матрице кэша под все новые эмбеддинги
+                self.cache_manager.reserve(len(files_to_process))
+                
                 # Этап 7: Обработка файлов по чанкам
                 progress_offset = 15  # 15% уже прошли на сканирование и кэш
                 progress_range = 80   # 80% на обработку файлов
@@ -327,6 +334,7 @@ class SearchEngine:
                 self.cache_manager.clear_chunk_progress(cache_key)
                 
                 self.is_index_built = True
+                self.index_version += 1
                 
                 if progress_callback:
                     progress_callback(100, 100, f"Индекс построен! Обработано {len(self.current_embeddings)} изображений")
@@ -382,7 +390,7 @@ class SearchEngine:
                     recursive=recursive,
                     date_filter=date_filter,
                     progress_callback=lambda current, total, msg: progress_callback(
-                        int(current / total * 10), 100, f"Сканирование: {msg}"
+                        int(current / total * 10) if total else 0, 100, f"Сканирование: {msg}"
                     ) if progress_callback else None
                 )
                 
@@ -439,6 +447,9 @@ class SearchEngine:
                 
                 # Этап 7: Обработка по чанкам
                 if files_to_process:
+                    # Резервируем место в матрице кэша под все новые эмбеддинги
+                    self.cache_manager.reserve(len(files_to_process))
+                    
                     success = self._process_files_in_chunks(
                         files_to_process, 
                         chunk_size, 
@@ -456,6 +467,7 @@ class SearchEngine:
                 
                 # Этап 8: Финализация
                 self.is_index_built = True
+                self.index_version += 1
                 
                 # Очистка прогресса после успешного завершения
                 self.cache_manager.clear_chunk_progress(directory_path)
@@ -656,7 +668,10 @@ class SearchEngine:
             
             # Подготовка данных для поиска
             file_paths = list(self.current_embeddings.keys())
-            embeddings_matrix = np.array([self.current_embeddings[path] for path in file_paths])
+            embeddings_matrix, cached_mask = self.cache_manager.get_cached_matrix(file_paths)
+            if not cached_mask.all():
+                # Часть эмбеддингов отсутствует в кэше: собираем матрицу из индекса
+                embeddings_matrix = np.array([self.current_embeddings[path] for path in file_paths])
             
             if len(embeddings_matrix) == 0:
                 return []
@@ -714,6 +729,7 @@ class SearchEngine:
             self.current_embeddings.clear()
             self.current_file_paths.clear()
             self.is_index_built = False
+            self.index_version += 1
             self._force_garbage_collection()
             logger.info("Индекс очищен")
     
@@ -194,7 +194,7 @@ def check_application_files():
         print("✅ cache/ - папка для кэша")
         
         # Статистика кэша
-        cache_files = list(Path('cache').glob('*.pkl'))
+        cache_files = [f for pattern in ('*.pkl', '*.npy', '*.blosc2') for f in Path('cache').glob(pattern)]
         if cache_files:
             total_size = sum(f.stat().st_size for f in cache_files)
             print(f"   Файлов кэша: {len(cache_files)}")
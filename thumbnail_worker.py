@@ -0,0 +1,52 @@
+"""
+Фоновый процесс подготовки миниатюр для панели результатов (ui/results_panel.py).
+Декодирование и масштабирование изображений выполняются вне процесса интерфейса,
+обратно передаются готовые RGB-буферы размера THUMBNAIL_SIZE.
+Модуль лежит вне пакета ui и сам не импортирует tkinter и модули поиска. При запуске через spawn
+(Windows) дочерний процесс также повторно импортирует главный модуль (main.py, а с ним tkinter и пакет ui),
+но не выполняет main(): torch и модель CLIP в нем не загружаются.
+"""
+
+from PIL import Image
+
+from config import THUMBNAIL_SIZE
+
+
+def render_thumbnail(image_path: str) -> bytes:
+    """
+    Создание миниатюры точного размера (изображение по центру на белом фоне).
+    
+    Args:
+        image_path: Путь к изображению
+        
+    Returns:
+        bytes: RGB-буфер размера THUMBNAIL_SIZE
+    """
+    with Image.open(image_path) as image:
+        # Миниатюра с сохранением пропорций (для JPEG декодирование идет сразу в уменьшенном масштабе)
+        image.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        
+        # Фон нужного размера для центрирования изображения
+        background = Image.new('RGB', THUMBNAIL_SIZE, color='white')
+        x = (THUMBNAIL_SIZE[0] - image.width) // 2
+        y = (THUMBNAIL_SIZE[1] - image.height) // 2
+        background.paste(image, (x, y))
+    
+    return background.tobytes()
+
+
+def thumbnail_worker(requests, results) -> None:
+    """
+    Цикл дочернего процесса: (поколение, путь) из requests -> (поколение, путь, буфер или None) в results.
+    Завершается при получении None.
+    
+    Args:
+        requests: multiprocessing.Queue с запросами
+        results: multiprocessing.Queue для готовых миниатюр
+    """
+    for generation, image_path in iter(requests.get, None):
+        try:
+            data = render_thumbnail(image_path)
+        except Exception:
+            data = None
+        results.put((generation, image_path, data))
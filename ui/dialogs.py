@@ -200,7 +200,8 @@ class MultipleFolderSelector:
             initial_folders: Список изначально выбранных папок
         """
         self.parent = parent
-        self.selected_folders = initial_folders.copy() if initial_folders else []
+        self.selected_folders = list(dict.fromkeys(initial_folders)) if initial_folders else []
+        self._selected_set = set(self.selected_folders)  # Для проверки принадлежности за O(1)
         self.folder_stats = {}  # Статистика по папкам {path: count}
         self.recursive = True
         self.confirmed = False
@@ -382,7 +383,7 @@ class MultipleFolderSelector:
             parent=self.window
         )
         
-        if directory and directory not in self.selected_folders:
+        if directory and directory not in self._selected_set:
             # Проверка на вложенные папки
             is_nested = False
             folders_to_remove = []
@@ -402,8 +403,10 @@ class MultipleFolderSelector:
                 # Удаляем вложенные папки
                 for folder in folders_to_remove:
                     self.selected_folders.remove(folder)
+                    self._selected_set.discard(folder)
                 
                 self.selected_folders.append(directory)
+                self._selected_set.add(directory)
                 self._refresh_folder_list()
                 self._update_stats()
     
@@ -414,6 +417,7 @@ class MultipleFolderSelector:
             "Удалить все выбранные папки?"
         ):
             self.selected_folders.clear()
+            self._selected_set.clear()
             self.folder_stats.clear()
             self._refresh_folder_list()
             self._update_stats()
@@ -505,8 +509,9 @@ class MultipleFolderSelector:
             values = self.folders_tree.item(item, 'values')
             folder_path = values[0]
             
-            if folder_path in self.selected_folders:
+            if folder_path in self._selected_set:
                 self.selected_folders.remove(folder_path)
+                self._selected_set.discard(folder_path)
                 if folder_path in self.folder_stats:
                     del self.folder_stats[folder_path]
                 self._refresh_folder_list()
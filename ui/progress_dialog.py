@@ -10,29 +10,39 @@ from config import FONTS
 class ProgressDialog:
     """Диалоговое окно для отображения прогресса выполнения операций."""
     
-    def __init__(self, parent, title: str = "Выполнение операции"):
+    def __init__(self, parent, title: str = "Выполнение операции", hidden: bool = False):
         """
         Инициализация диалога прогресса.
         
         Args:
             parent: Родительское окно
             title: Заголовок диалога
+            hidden: Создать скрытым для повторного использования через reset()/hide()
         """
         self.parent = parent
+        self.persistent = hidden
         self.window = tk.Toplevel(parent)
         self.window.title(title)
         self.window.geometry("400x150")
         self.window.transient(parent)
-        self.window.grab_set()
-        
-        # Центрирование окна
-        self.window.geometry("+{}+{}".format(
-            parent.winfo_rootx() + 50,
-            parent.winfo_rooty() + 50
-        ))
         
         self.cancelled = False
+        # Номер текущей операции переиспользуемого диалога: операции с прежним номером считаются отмененными
+        self.job = 0
         self._setup_ui()
+        
+        if hidden:
+            self.window.withdraw()
+        else:
+            self._place_and_grab()
+    
+    def _place_and_grab(self):
+        """Позиционирование относительно родительского окна и захват ввода."""
+        self.window.geometry("+{}+{}".format(
+            self.parent.winfo_rootx() + 50,
+            self.parent.winfo_rooty() + 50
+        ))
+        self.window.grab_set()
     
     def _setup_ui(self):
         """Настройка интерфейса диалога."""
@@ -77,7 +87,7 @@ class ProgressDialog:
         # Обработка закрытия окна
         self.window.protocol("WM_DELETE_WINDOW", self._on_cancel)
     
-    def update_progress(self, current: int, total: int, message: str = ""):
+    def update_progress(self, current: int, total: int, message: str = "", job: int = None):
         """
         Обновление прогресса выполнения.
         
@@ -85,7 +95,11 @@ class ProgressDialog:
             current: Текущее значение
             total: Максимальное значение
             message: Сообщение о состоянии
+            job: Номер операции из reset(); прогресс отмененной или прежней операции игнорируется
         """
+        if job is not None and self.is_cancelled(job):
+            return
+        
         if total > 0:
             progress = int((current / total) * 100)
         else:
@@ -104,12 +118,53 @@ class ProgressDialog:
     def _on_cancel(self):
         """Обработка отмены операции."""
         self.cancelled = True
-        self.window.destroy()
+        if self.persistent:
+            self.hide()
+        else:
+            self.window.destroy()
+    
+    def reset(self, title: str) -> int:
+        """
+        Показ переиспользуемого диалога для новой операции.
+        
+        Args:
+            title: Заголовок диалога
+            
+        Returns:
+            int: Номер операции для is_cancelled(), update_progress() и hide()
+        """
+        self.job += 1
+        self.cancelled = False
+        self.window.title(title)
+        self._update_ui(0, "Инициализация...")
+        self.window.deiconify()
+        self._place_and_grab()
+        return self.job
+    
+    def hide(self, job: int = None):
+        """
+        Скрытие диалога без уничтожения окна.
+        
+        Args:
+            job: Номер операции из reset(); диалог, уже показанный для другой операции, не скрывается
+        """
+        if job is not None and job != self.job:
+            return
+        self.window.grab_release()
+        self.window.withdraw()
     
     def close(self):
-        """Закрытие диалога."""
-        self.window.destroy()
+        """Закрытие диалога (переиспользуемый диалог только скрывается)."""
+        if self.persistent:
+            self.hide()
+        else:
+            self.window.destroy()
     
-    def is_cancelled(self) -> bool:
-        """Проверка, была ли операция отменена."""
-        return self.cancelled
+    def is_cancelled(self, job: int = None) -> bool:
+        """
+        Проверка, была ли операция отменена.
+        
+        Args:
+            job: Номер операции из reset(); операция, вместо которой уже запущена новая, считается отмененной
+        """
+        return self.cancelled or (job is not None and job != self.job)
@@ -6,17 +6,29 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk
 import threading
-from typing import List
+import multiprocessing
+import queue
+from typing import List, TYPE_CHECKING
 import os
 import logging
 from pathlib import Path
 
 from config import THUMBNAIL_SIZE, COLORS, FONTS
-from search_engine import SearchResult
 from photo_saver import PhotoSaver
+from thumbnail_worker import render_thumbnail, thumbnail_worker
+
+if TYPE_CHECKING:
+    # Только для аннотаций: search_engine тянет torch, а панель создается до загрузки движка
+    from search_engine import SearchResult
 
 logger = logging.getLogger(__name__)
 
+# Период опроса готовых миниатюр от фонового процесса (мс)
+THUMBNAIL_POLL_MS = 30
+# Миниатюры строятся только для строк вблизи видимой области, порциями
+THUMBNAIL_WINDOW = 40
+THUMBNAIL_LOAD_BATCH = 10
+
 
 class ResultsPanel(ttk.Frame):
     """Панель для отображения результатов поиска."""
@@ -30,8 +42,8 @@ class ResultsPanel(ttk.Frame):
         """
         super().__init__(parent)
         self.parent = parent
-        self.results: List[SearchResult] = []
-        self.selected_results: List[SearchResult] = []  # Список выбранных результатов
+        self.results: List['SearchResult'] = []
+        self.selected_results: List['SearchResult'] = []  # Список выбранных результатов
         self.checkboxes: List[tk.BooleanVar] = []  # Переменные для чекбоксов
         self.photo_saver = PhotoSaver()  # Экземпляр сохранялки фотографий
         
@@ -123,7 +135,7 @@ class ResultsPanel(ttk.Frame):
             orient="vertical", 
             command=self.tree.yview
         )
-        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
         
         # Размещение элементов
         self.tree.pack(side="left", fill="both", expand=True)
@@ -137,6 +149,7 @@ class ResultsPanel(ttk.Frame):
         
         # Привязка прокрутки колесом мыши (Treeview поддерживает это автоматически)
         self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Configure>", lambda event: self._schedule_visible_thumbnails())
         
         # Словарь для хранения checkbox состояний по item_id
         self.item_checkboxes = {}
@@ -144,6 +157,19 @@ class ResultsPanel(ttk.Frame):
         # Кэш миниатюр для оптимизации
         self.thumbnail_cache = {}
         
+        # Фоновый процесс миниатюр (запускается при первом показе результатов)
+        self._thumbnail_process = None
+        self._thumbnail_process_failed = False
+        self._thumbnail_requests = None
+        self._thumbnail_results = None
+        # Поколение результатов: миниатюры от предыдущего поиска отбрасываются
+        self._thumbnail_generation = 0
+        self._pending_thumbnails = {}  # путь -> [item_id, ...]
+        self._thumbnail_after_id = None
+        # Строки без запрошенной миниатюры: item_id -> путь
+        self._unloaded_thumbnails = {}
+        self._visible_after_id = None
+        
         # Устанавливаем фокус на treeview
         self.tree.focus_set()
         
@@ -169,7 +195,40 @@ class ResultsPanel(ttk.Frame):
             self.tree.yview_scroll(delta, "units")
             
         except Exception as e:
-            print(f"Mousewheel error: {e}")
+            logger.debug("Ошибка прокрутки: %s", e)
+    
+    def _on_tree_yscroll(self, first, last):
+        """Синхронизация scrollbar и подгрузка миниатюр для ставших видимыми строк."""
+        self.scrollbar.set(first, last)
+        self._schedule_visible_thumbnails()
+    
+    def _schedule_visible_thumbnails(self):
+        """Планирование загрузки миниатюр видимых строк на ближайший простой цикла Tk."""
+        if self._visible_after_id is None and self._unloaded_thumbnails:
+            self._visible_after_id = self.after_idle(self._load_visible_thumbnails)
+    
+    def _load_visible_thumbnails(self):
+        """Запрос миниатюр для окна строк от верхней видимой строки, не более пакета за вызов."""
+        self._visible_after_id = None
+        total = len(self.result_to_item_map)
+        if not total or not self._unloaded_thumbnails:
+            return
+        
+        start = int(self.tree.yview()[0] * total)
+        end = min(total, start + THUMBNAIL_WINDOW)
+        requested = 0
+        for index in range(start, end):
+            item_id = self.result_to_item_map.get(index)
+            image_path = self._unloaded_thumbnails.pop(item_id, None)
+            if image_path is None:
+                continue
+            
+            self._request_thumbnail(image_path, item_id)
+            requested += 1
+            if requested >= THUMBNAIL_LOAD_BATCH:
+                # Остаток окна - следующей порцией, чтобы не задерживать обработку событий
+                self._schedule_visible_thumbnails()
+                break
     
     def _on_double_click(self, event):
         """Обработка двойного клика - открытие файла."""
@@ -247,7 +306,7 @@ class ResultsPanel(ttk.Frame):
         # Дополнительные стили для лучшего визуального представления
         self.tree.tag_configure('message', background='#f8f8f8', foreground='gray')
     
-    def show_results(self, results: List[SearchResult]):
+    def show_results(self, results: List['SearchResult']):
         """
         Отображение результатов поиска в Treeview.
         
@@ -264,7 +323,7 @@ class ResultsPanel(ttk.Frame):
             self._update_control_panel()
             return
         
-        print(f"Loading {len(results)} results into Treeview...")
+        logger.debug("Загрузка %d результатов в Treeview", len(results))
         
         # Очищаем маппинги
         self.item_to_result_map.clear()
@@ -285,21 +344,26 @@ class ResultsPanel(ttk.Frame):
             # Обновление интерфейса для отзывчивости
             if i > 0:
                 self.tree.update_idletasks()
-                print(f"Loaded {batch_end} of {len(results)} results...")
+                logger.debug("Загружено %d из %d результатов", batch_end, len(results))
         
-        print(f"All {len(results)} results loaded into Treeview")
+        logger.debug("Все %d результатов загружены в Treeview", len(results))
+        
+        # Миниатюры запрашиваются только для видимого окна, остальные - при прокрутке
+        self._schedule_visible_thumbnails()
         
         # Устанавливаем фокус и обновляем панель управления
         self.tree.focus_set()
         self._update_control_panel()
     
-    def _load_results_batch(self, results: List[SearchResult], start_index: int, end_index: int):
+    def _load_results_batch(self, results: List['SearchResult'], start_index: int, end_index: int):
         """Загрузка пакета результатов в Treeview."""
         for i in range(start_index, end_index):
             result = results[i]
             
-            # Создаем миниатюру изображения
-            thumbnail = self._get_or_create_thumbnail(result.file_path)
+            # Готовая миниатюра берется из кэша, остальные строятся в фоновом процессе
+            thumbnail = self.thumbnail_cache.get(result.file_path)
+            if thumbnail is None:
+                thumbnail = self._get_loading_thumbnail()
             
             # Форматируем данные для отображения
             file_size = result.file_info.get('size', result.file_info.get('file_size', 0))
@@ -332,6 +396,98 @@ class ResultsPanel(ttk.Frame):
             # Сохраняем маппинги
             self.item_to_result_map[item_id] = i
             self.result_to_item_map[i] = item_id
+            
+            if result.file_path not in self.thumbnail_cache:
+                self._unloaded_thumbnails[item_id] = result.file_path
+    
+    def _start_thumbnail_process(self) -> bool:
+        """
+        Запуск фонового процесса миниатюр при первом обращении.
+        
+        Returns:
+            bool: True если процесс работает
+        """
+        if self._thumbnail_process is not None:
+            return self._thumbnail_process.is_alive()
+        if self._thumbnail_process_failed:
+            return False
+        
+        try:
+            self._thumbnail_requests = multiprocessing.Queue()
+            self._thumbnail_results = multiprocessing.Queue()
+            self._thumbnail_process = multiprocessing.Process(
+                target=thumbnail_worker,
+                args=(self._thumbnail_requests, self._thumbnail_results),
+                name='thumbnails',
+                daemon=True
+            )
+            self._thumbnail_process.start()
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось запустить процесс миниатюр, используется основной поток: {e}")
+            self._thumbnail_process = None
+            self._thumbnail_process_failed = True
+            return False
+    
+    def _request_thumbnail(self, image_path: str, item_id: str):
+        """
+        Запрос миниатюры для строки результатов у фонового процесса.
+        Если процесс недоступен, миниатюра создается сразу в основном потоке.
+        """
+        if not self._start_thumbnail_process():
+            self.tree.item(item_id, image=self._get_or_create_thumbnail(image_path))
+            return
+        
+        item_ids = self._pending_thumbnails.setdefault(image_path, [])
+        item_ids.append(item_id)
+        if len(item_ids) == 1:
+            self._thumbnail_requests.put((self._thumbnail_generation, image_path))
+        
+        if self._thumbnail_after_id is None:
+            self._thumbnail_after_id = self.after(THUMBNAIL_POLL_MS, self._drain_thumbnails)
+    
+    def _drain_thumbnails(self):
+        """Установка готовых миниатюр в строки результатов (только обертка буфера в PhotoImage)."""
+        self._thumbnail_after_id = None
+        try:
+            while True:
+                generation, image_path, data = self._thumbnail_results.get_nowait()
+                if generation != self._thumbnail_generation:
+                    continue
+                
+                item_ids = self._pending_thumbnails.pop(image_path, [])
+                if data is None:
+                    logger.warning("Не удалось создать миниатюру для %s", image_path)
+                    thumbnail = self._get_placeholder_thumbnail()
+                else:
+                    thumbnail = ImageTk.PhotoImage(Image.frombytes('RGB', THUMBNAIL_SIZE, data))
+                    self.thumbnail_cache[image_path] = thumbnail
+                
+                for item_id in item_ids:
+                    if self.tree.exists(item_id):
+                        self.tree.item(item_id, image=thumbnail)
+        except queue.Empty:
+            pass
+        
+        if self._pending_thumbnails and not self._thumbnail_process.is_alive():
+            # Процесс завершился: отправленные запросы уже не будут выполнены, миниатюры
+            # для них создаются в основном потоке (как и все последующие)
+            logger.warning("Процесс миниатюр завершился, миниатюры создаются в основном потоке")
+            pending, self._pending_thumbnails = self._pending_thumbnails, {}
+            for image_path, item_ids in pending.items():
+                thumbnail = self._get_or_create_thumbnail(image_path)
+                for item_id in item_ids:
+                    if self.tree.exists(item_id):
+                        self.tree.item(item_id, image=thumbnail)
+        
+        if self._pending_thumbnails:
+            self._thumbnail_after_id = self.after(THUMBNAIL_POLL_MS, self._drain_thumbnails)
+    
+    def _get_loading_thumbnail(self) -> ImageTk.PhotoImage:
+        """Пустая миниатюра, показываемая до готовности настоящей."""
+        if 'loading' not in self.thumbnail_cache:
+            self.thumbnail_cache['loading'] = ImageTk.PhotoImage(Image.new('RGB', THUMBNAIL_SIZE, color='white'))
+        return self.thumbnail_cache['loading']
     
     def _get_or_create_thumbnail(self, image_path: str) -> ImageTk.PhotoImage:
         """Получение или создание миниатюры изображения с кэшированием."""
@@ -343,40 +499,44 @@ class ResultsPanel(ttk.Frame):
             self.thumbnail_cache[image_path] = thumbnail
             return thumbnail
         except Exception as e:
-            logger.warning(f"Не удалось создать миниатюру для {image_path}: {e}")
-            # Возвращаем пустую иконку или placeholder
-            if 'placeholder' not in self.thumbnail_cache:
-                # Создаем улучшенный placeholder точного размера
-                placeholder_img = Image.new('RGB', THUMBNAIL_SIZE, color='#f0f0f0')
+            logger.warning("Не удалось создать миниатюру для %s: %s", image_path, e)
+            return self._get_placeholder_thumbnail()
+    
+    def _get_placeholder_thumbnail(self) -> ImageTk.PhotoImage:
+        """Миниатюра-заглушка для изображений, которые не удалось открыть."""
+        # Возвращаем пустую иконку или placeholder
+        if 'placeholder' not in self.thumbnail_cache:
+            # Создаем улучшенный placeholder точного размера
+            placeholder_img = Image.new('RGB', THUMBNAIL_SIZE, color='#f0f0f0')
+            
+            # Добавляем текст "Нет изображения" в placeholder
+            try:
+                from PIL import ImageDraw, ImageFont
+                draw = ImageDraw.Draw(placeholder_img)
                 
-                # Добавляем текст "Нет изображения" в placeholder
+                # Пытаемся использовать стандартный шрифт
                 try:
-                    from PIL import ImageDraw, ImageFont
-                    draw = ImageDraw.Draw(placeholder_img)
-                    
-                    # Пытаемся использовать стандартный шрифт
-                    try:
-                        font = ImageFont.truetype("arial.ttf", 12)
-                    except:
-                        font = ImageFont.load_default()
-                    
-                    # Рисуем текст по центру
-                    text = "Нет\nизображения"
-                    text_bbox = draw.textbbox((0, 0), text, font=font)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    text_height = text_bbox[3] - text_bbox[1]
-                    
-                    x = (THUMBNAIL_SIZE[0] - text_width) // 2
-                    y = (THUMBNAIL_SIZE[1] - text_height) // 2
-                    
-                    draw.text((x, y), text, fill='#888888', font=font, align='center')
-                    
-                except ImportError:
-                    # Если PIL.ImageDraw недоступен, создаем простой серый квадрат
-                    pass
-                    
-                self.thumbnail_cache['placeholder'] = ImageTk.PhotoImage(placeholder_img)
-            return self.thumbnail_cache['placeholder']
+                    font = ImageFont.truetype("arial.ttf", 12)
+                except:
+                    font = ImageFont.load_default()
+                
+                # Рисуем текст по центру
+                text = "Нет\nизображения"
+                text_bbox = draw.textbbox((0, 0), text, font=font)
+                text_width = text_bbox[2] - text_bbox[0]
+                text_height = text_bbox[3] - text_bbox[1]
+                
+                x = (THUMBNAIL_SIZE[0] - text_width) // 2
+                y = (THUMBNAIL_SIZE[1] - text_height) // 2
+                
+                draw.text((x, y), text, fill='#888888', font=font, align='center')
+                
+            except ImportError:
+                # Если PIL.ImageDraw недоступен, создаем простой серый квадрат
+                pass
+                
+            self.thumbnail_cache['placeholder'] = ImageTk.PhotoImage(placeholder_img)
+        return self.thumbnail_cache['placeholder']
     
     def _clear_results(self):
         """Очистка текущих результатов."""
@@ -388,11 +548,22 @@ class ResultsPanel(ttk.Frame):
         self.item_to_result_map.clear()
         self.result_to_item_map.clear()
         
-        # Очищаем кэш миниатюр (кроме placeholder)
-        placeholder = self.thumbnail_cache.get('placeholder')
+        # Очищаем кэш миниатюр (кроме заглушек)
+        placeholders = {key: self.thumbnail_cache[key] for key in ('placeholder', 'loading')
+                        if key in self.thumbnail_cache}
         self.thumbnail_cache.clear()
-        if placeholder:
-            self.thumbnail_cache['placeholder'] = placeholder
+        self.thumbnail_cache.update(placeholders)
+        
+        # Миниатюры для прежних строк больше не нужны: новое поколение, неначатые запросы снимаются
+        self._thumbnail_generation += 1
+        self._pending_thumbnails.clear()
+        self._unloaded_thumbnails.clear()
+        if self._thumbnail_requests is not None:
+            try:
+                while True:
+                    self._thumbnail_requests.get_nowait()
+            except queue.Empty:
+                pass
     
     def _create_thumbnail(self, image_path: str) -> ImageTk.PhotoImage:
         """
@@ -405,26 +576,12 @@ class ResultsPanel(ttk.Frame):
             ImageTk.PhotoImage: Миниатюра изображения
         """
         try:
-            image = Image.open(image_path)
-            
-            # Создаем миниатюру с сохранением пропорций
-            image.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-            
-            # Создаем фон нужного размера для центрирования изображения
-            background = Image.new('RGB', THUMBNAIL_SIZE, color='white')
-            
-            # Вычисляем позицию для центрирования
-            x = (THUMBNAIL_SIZE[0] - image.width) // 2
-            y = (THUMBNAIL_SIZE[1] - image.height) // 2
-            
-            # Вставляем изображение в центр
-            background.paste(image, (x, y))
-            
-            return ImageTk.PhotoImage(background)
+            data = render_thumbnail(image_path)
+            return ImageTk.PhotoImage(Image.frombytes('RGB', THUMBNAIL_SIZE, data))
             
         except Exception as e:
             # В случае ошибки возвращаем placeholder
-            logger.warning(f"Не удалось создать миниатюру для {image_path}: {e}")
+            logger.warning("Не удалось создать миниатюру для %s: %s", image_path, e)
             raise
     
     def _format_file_size(self, size_bytes: int) -> str: